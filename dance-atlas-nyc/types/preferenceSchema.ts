@@ -8,12 +8,16 @@ export type DayOfWeek =
   | "Saturday"
   | "Sunday";
 
-export type Studio =
-  | "Peri"
-  | "BDC"
-  | "Modega"
-  | "Brickhouse"
-  | "ILoveDanceManhattan";
+// studios crawled into Firestore, see database/site_data.json
+export const STUDIOS = [
+  "Peri",
+  "BDC",
+  "Modega",
+  "Brickhouse",
+  "ILoveDanceManhattan",
+] as const;
+
+export type Studio = (typeof STUDIOS)[number];
 
 export interface Preferences {
   instructor: string;
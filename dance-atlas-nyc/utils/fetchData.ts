@@ -1,6 +1,11 @@
 import { db } from "./firebaseAdmin";
 import { SessionData } from "@/types/dataSchema";
+import { STUDIOS } from "@/types/preferenceSchema";
 import { convertFirestoreDocToSessionData } from "./convert_data";
+import moment from "moment-timezone";
+
+// `in` filters take at most 30 values
+const MAX_IN_VALUES = 30;
 
 interface OrganizedData {
   [studioName: string]: {
@@ -8,32 +13,47 @@ interface OrganizedData {
   };
 }
 
-export async function fetchAndOrganizeClasses(): Promise<OrganizedData> {
-  const organizedData: OrganizedData = {};
-
-  const classesRef = db.collection("classes");
-  const studioDocs = await classesRef.listDocuments();
-  const studioNames = studioDocs.map((doc) => doc.id);
-  for (const studioName of studioNames) {
-    organizedData[studioName] = {};
-
-    const studioDocRef = db.collection("classes").doc(studioName);
-
-    // List all collections under the studio document
-    const dateCollections = await studioDocRef.listCollections();
-
-    for (const dateCollection of dateCollections) {
-      const date = dateCollection.id;
-      organizedData[studioName][date] = [];
-
-      // Fetch all classes for this date collection
-      const classesSnapshot = await dateCollection.get();
-
-      const classDataArray = classesSnapshot.docs.map((doc) =>
-        convertFirestoreDocToSessionData(doc.data())
+// weekly snapshots published by the crawler, one document per studio and ISO week
+async function fetchWeeklySnapshots(): Promise<OrganizedData> {
+  const snapshotData: OrganizedData = {};
+  const currentWeek = moment().tz("America/New_York").format("GGGG-[W]WW");
+
+  const snapshots = await db
+    .collection("schedules")
+    .where("week", ">=", currentWeek)
+    .get();
+  for (const doc of snapshots.docs) {
+    const { studio, dates } = doc.data();
+    snapshotData[studio] = snapshotData[studio] || {};
+    for (const [date, classes] of Object.entries(dates || {})) {
+      snapshotData[studio][date] = (classes as any[]).map((session) =>
+        convertFirestoreDocToSessionData(session)
       );
+    }
+  }
+  return snapshotData;
+}
 
-      organizedData[studioName][date] = classDataArray;
+export async function fetchAndOrganizeClasses(): Promise<OrganizedData> {
+  const organizedData: OrganizedData = await fetchWeeklySnapshots();
+
+  // fall back to the flat sessions collection for studios without a snapshot (none
+  // are published for a studio whose last crawl was incomplete), reading only their
+  // upcoming classes instead of every date collection ever stored
+  const missing = STUDIOS.filter((studio) => !(studio in organizedData));
+  const startOfToday = moment().tz("America/New_York").startOf("day").toDate();
+  for (let i = 0; i < missing.length; i += MAX_IN_VALUES) {
+    const sessions = await db
+      .collection("sessions")
+      .where("studio", "in", missing.slice(i, i + MAX_IN_VALUES))
+      .where("start_time", ">=", startOfToday)
+      .orderBy("start_time")
+      .get();
+    for (const doc of sessions.docs) {
+      const { studio, date, ...session } = doc.data();
+      organizedData[studio] = organizedData[studio] || {};
+      organizedData[studio][date] = organizedData[studio][date] || [];
+      organizedData[studio][date].push(convertFirestoreDocToSessionData(session));
     }
   }
 
@@ -0,0 +1,175 @@
+from main import studio_mapping, studio_specs
+from drivers.chrome import PROFILES
+from drivers.command_counter import CommandCounter
+from drivers.provider import DriverProvider
+from replay.record import DEFAULT_FIXTURES_DIR
+from replay.server import serve_fixtures
+from studios.base_studio_handler import BaseStudioHandler
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+"""
+Crawl benchmark against recorded fixtures (see replay/record.py), so crawler
+changes can be measured without the live sites.
+
+For every studio it reports wall time, WebDriver round-trips, sessions parsed per
+second and peak memory: Python allocations, plus the page's JS heap in browser
+mode. Browser mode runs each crawler against the fixture server; static mode
+parses the recorded HTML without a browser.
+
+Studios clicking through a calendar (see `StudioSpec.clicks_days`) are skipped in
+browser mode: the fixture server does not replay the api responses a click loads,
+so their clicks would only time out and re-read the recorded day.
+"""
+
+
+def fixture_files(fixtures_dir: str, studio: str) -> List[str]:
+    studio_dir = os.path.join(fixtures_dir, studio)
+    with open(os.path.join(studio_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    names = [manifest["page"]] + [name for name in manifest["frames"] if name]
+    return [os.path.join(studio_dir, name) for name in names]
+
+
+def js_heap_used(driver) -> Optional[int]:
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    except Exception:
+        return None
+    return next((m["value"] for m in metrics if m["name"] == "JSHeapUsedSize"), None)
+
+
+def run_static(studio: str, crawler: BaseStudioHandler, fixtures_dir: str) -> Dict:
+    start = time.perf_counter()
+    for path in fixture_files(fixtures_dir, studio):
+        if crawler.crawl_static(path):
+            break
+    return {"wall_seconds": time.perf_counter() - start, "webdriver_commands": 0}
+
+
+def run_browser(studio: str, crawler: BaseStudioHandler, driver) -> Dict:
+    counter: CommandCounter = driver.command_counter
+    counter.reset()
+    start = time.perf_counter()
+    crawler.driver = driver
+    try:
+        crawler.crawl()
+    except Exception as e:
+        print(f"error while crawling {studio}: {e}")
+    wall = time.perf_counter() - start
+    commands = counter.total
+    return {
+        "wall_seconds": wall,
+        "webdriver_commands": commands,
+        "js_heap_bytes": js_heap_used(driver),
+        "waits": crawler.wait_log,
+    }
+
+
+def main(args) -> List[Dict]:
+    results = []
+    studios = [
+        studio
+        for studio in args.studios
+        if os.path.exists(os.path.join(args.fixtures, studio, "manifest.json"))
+    ]
+    missing = set(args.studios) - set(studios)
+    if missing:
+        print(f"no fixtures recorded for: {', '.join(sorted(missing))}")
+    skipped = []
+    if args.mode == "browser":
+        skipped = [studio for studio in studios if studio_specs[studio].clicks_days]
+        studios = [studio for studio in studios if studio not in skipped]
+    if skipped:
+        print(
+            f"skipping calendar studios in browser mode: {', '.join(skipped)} "
+            "(days are loaded from api responses the fixtures do not replay)"
+        )
+
+    server, base_url = serve_fixtures(args.fixtures)
+    driver = None
+    provider = DriverProvider(PROFILES[args.profile])
+    try:
+        if args.mode == "browser":
+            driver = provider()
+        for studio in studios:
+            crawler_class = studio_mapping[studio]["crawler"]
+            crawler = crawler_class(None, f"{base_url}/{studio}")
+            tracemalloc.start()
+            if args.mode == "static":
+                result = run_static(studio, crawler, args.fixtures)
+            else:
+                result = run_browser(studio, crawler, driver)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            sessions = len(crawler.data)
+            wall = result["wall_seconds"]
+            result.update(
+                {
+                    "studio": studio,
+                    "mode": args.mode,
+                    "sessions": sessions,
+                    "sessions_per_second": sessions / wall if wall else 0.0,
+                    "python_peak_bytes": peak,
+                }
+            )
+            results.append(result)
+    finally:
+        if driver is not None:
+            driver.quit()
+        server.shutdown()
+
+    print(
+        f"{'studio':<22}{'wall s':>9}{'commands':>10}{'sessions':>10}{'per s':>10}{'py peak KB':>12}"
+    )
+    for r in results:
+        print(
+            f"{r['studio']:<22}{r['wall_seconds']:>9.2f}{r['webdriver_commands']:>10}"
+            f"{r['sessions']:>10}{r['sessions_per_second']:>10.1f}"
+            f"{r['python_peak_bytes'] / 1024:>12.0f}"
+        )
+    if provider.startup_times:
+        print(f"driver startup: {provider.startup_times[0]:.2f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "driver_startup_seconds": provider.startup_times,
+                    "studios": results,
+                    "skipped": skipped,
+                },
+                f,
+                indent=2,
+            )
+    return results
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark crawlers on recorded fixtures."
+    )
+    parser.add_argument("--fixtures", type=str, default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--studios", nargs="*", default=list(studio_mapping))
+    parser.add_argument(
+        "--mode",
+        type=str,
+        choices=["browser", "static"],
+        default="browser",
+        help='"browser" crawls the fixture server with Chrome, "static" parses the recorded HTML. Defaults to "browser".',
+    )
+    parser.add_argument("--profile", type=str, choices=["lean", "full"], default="lean")
+    parser.add_argument(
+        "--json", type=str, default=None, help="Write the results to this file."
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
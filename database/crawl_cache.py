@@ -0,0 +1,88 @@
+from studios.session import Session, SessionBatch
+from datetime import datetime
+from typing import Optional
+import hashlib
+import json
+import os
+import time
+
+"""
+On-disk cache of each studio's parsed sessions, so that re-running the crawler
+after one studio failed (or while iterating in dev mode) only re-crawls the
+studios that are missing, stale or explicitly refreshed.
+
+Entries live in `{cache_dir}/{studio}.json` and are keyed by the studio, its URL
+and the date window that was crawled; an entry for another key (e.g. yesterday's
+window or a changed URL) or older than the TTL is treated as a miss. Only
+successful crawls are cached.
+"""
+
+DEFAULT_CACHE_DIR = ".crawl-cache"
+DEFAULT_TTL_HOURS = 6.0
+
+
+def cache_key(studio: str, url: str, window: str) -> str:
+    return hashlib.sha1(f"{studio}|{url}|{window}".encode("utf-8")).hexdigest()
+
+
+def _serialize(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+class CrawlCache:
+    def __init__(
+        self, cache_dir: str = DEFAULT_CACHE_DIR, ttl_hours: float = DEFAULT_TTL_HOURS
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl_hours * 3600
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _path(self, studio: str) -> str:
+        return os.path.join(self.cache_dir, f"{studio}.json")
+
+    def load(self, studio: str, url: str, window: str) -> Optional[SessionBatch]:
+        """
+        return the cached sessions of `studio`, or None when there is no fresh
+        entry for this url and window
+        """
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(studio)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != cache_key(studio, url, window):
+            return None
+        if time.time() - entry.get("crawled_at", 0) > self.ttl:
+            return None
+
+        batch = SessionBatch(studio)
+        for record in entry.get("sessions", []):
+            for name in ("start_time", "end_time"):
+                record[name] = datetime.fromisoformat(record[name])
+            batch.append(Session.from_dict(record))
+        return batch
+
+    def save(self, studio: str, url: str, window: str, sessions: SessionBatch) -> None:
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "key": cache_key(studio, url, window),
+            "studio": studio,
+            "url": url,
+            "window": window,
+            "crawled_at": time.time(),
+            "sessions": sessions.to_records(),
+        }
+        # write then rename, so an interrupted run never leaves a truncated entry
+        path = self._path(studio)
+        with open(path + ".tmp", "w") as f:
+            json.dump(entry, f, default=_serialize)
+        os.replace(path + ".tmp", path)
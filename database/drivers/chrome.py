@@ -0,0 +1,155 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional
+import os
+
+"""
+Chrome WebDriver construction shared by the sequential and parallel crawl modes.
+
+A `CrawlProfile` controls how heavy each browser is. The lean profile runs
+headless, returns from page loads at DOMContentLoaded (`eager`), skips images and
+blocks trackers, ads, web fonts and media through the DevTools protocol; none of
+these are needed by the schedule selectors. Stylesheets can be blocked as well,
+but visibility checks depend on them, so that stays opt-in. Performance logging
+is enabled so crawlers can read schedule data straight from network responses.
+"""
+
+DEFAULT_BLOCKED_URLS = [
+    # analytics, tag managers and ads
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*connect.facebook.net*",
+    "*hotjar.com*",
+    "*static.hotjar.com*",
+    "*clarity.ms*",
+    # web fonts and media
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*.mp4",
+    "*.webm",
+    "*.mp3",
+]
+
+
+@dataclass
+class CrawlProfile:
+    headless: bool = True
+    block_images: bool = True
+    block_stylesheets: bool = False
+    blocked_url_patterns: List[str] = field(
+        default_factory=lambda: list(DEFAULT_BLOCKED_URLS)
+    )
+    page_load_strategy: str = "eager"
+    # keep DevTools performance logs so handlers can read the widget's responses
+    capture_network: bool = True
+
+
+PROFILES = {
+    "lean": CrawlProfile(),
+    # the original full browser: visible window, every resource loaded
+    "full": CrawlProfile(
+        headless=False,
+        block_images=False,
+        blocked_url_patterns=[],
+        page_load_strategy="normal",
+        capture_network=False,
+    ),
+}
+
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
+)
+
+
+@lru_cache(maxsize=None)
+def resolve_chromedriver() -> str:
+    """
+    locate chromedriver once per process: a pinned CHROMEDRIVER_PATH, otherwise
+    ChromeDriverManager (a version lookup over the network and possibly a
+    download). A chromedriver found on the PATH is not used, it may not match the
+    installed Chrome.
+    """
+    pinned = os.getenv("CHROMEDRIVER_PATH")
+    if pinned:
+        return pinned
+    # Use ChromeDriverManager to install and manage the ChromeDriver executable
+    return ChromeDriverManager().install()
+
+
+def chrome_arguments(profile: CrawlProfile) -> List[str]:
+    """
+    command line switches for a browser running `profile`, shared by drivers that
+    launch Chrome and by long-lived browsers started separately
+    """
+    arguments = []
+    if profile.headless:
+        arguments.append("--headless=new")
+        # a desktop-sized viewport keeps the studio sites on their desktop layout
+        arguments.append("--window-size=1920,1080")
+    arguments += [
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--ignore-certificate-errors",
+        "--ignore-ssl-errors",
+        f"user-agent={USER_AGENT}",
+        # crawlers load several days in background tabs at once, keep them running
+        # at full speed
+        "--disable-background-timer-throttling",
+        "--disable-renderer-backgrounding",
+        "--disable-backgrounding-occluded-windows",
+    ]
+    if profile.block_images:
+        arguments.append("--blink-settings=imagesEnabled=false")
+    return arguments
+
+
+def create_chrome_driver(
+    profile: CrawlProfile = PROFILES["full"],
+    user_data_dir: Optional[str] = None,
+    debugger_address: Optional[str] = None,
+) -> webdriver.Chrome:
+    """
+    start a driver with `profile`. `user_data_dir` keeps the browser profile (cache,
+    cookies of dismissed popups) between runs; `debugger_address` attaches to an
+    already running browser instead of launching one.
+    """
+    options = webdriver.ChromeOptions()
+    if debugger_address is not None:
+        # the running browser was launched with the profile's switches already
+        options.debugger_address = debugger_address
+    else:
+        for argument in chrome_arguments(profile):
+            options.add_argument(argument)
+        if user_data_dir is not None:
+            options.add_argument(f"--user-data-dir={user_data_dir}")
+    options.page_load_strategy = profile.page_load_strategy
+    if profile.capture_network:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    driver = webdriver.Chrome(service=Service(resolve_chromedriver()), options=options)
+    # read back when the crawler opens more tabs, see `apply_blocking`
+    driver.crawl_profile = profile
+    apply_blocking(driver, profile)
+    return driver
+
+
+def apply_blocking(driver: webdriver.Chrome, profile: CrawlProfile) -> None:
+    """
+    block the profile's url patterns in the driver's current tab. DevTools
+    settings are per tab, so this is repeated for every tab a crawler opens.
+    """
+    blocked_urls = list(profile.blocked_url_patterns)
+    if profile.block_stylesheets:
+        blocked_urls.append("*.css")
+    if blocked_urls:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls})
@@ -0,0 +1,38 @@
+from selenium.webdriver.remote.webdriver import WebDriver
+from collections import Counter
+import threading
+
+"""
+Counts the WebDriver commands (HTTP round-trips to chromedriver) a driver issues.
+Every Selenium call funnels through `WebDriver.execute`, so wrapping it on the
+driver instance sees all of them, including those made by located elements.
+"""
+
+
+class CommandCounter:
+    def __init__(self):
+        self.commands: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        return sum(self.commands.values())
+
+    def attach(self, driver: WebDriver) -> WebDriver:
+        """
+        start counting the commands of `driver`, returns the same driver
+        """
+        execute = driver.execute
+
+        def counted_execute(driver_command, params=None):
+            with self._lock:
+                self.commands[driver_command] += 1
+            return execute(driver_command, params)
+
+        driver.execute = counted_execute
+        return driver
+
+    def reset(self) -> Counter:
+        with self._lock:
+            commands, self.commands = self.commands, Counter()
+        return commands
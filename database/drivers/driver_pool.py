@@ -0,0 +1,97 @@
+from selenium.webdriver.remote.webdriver import WebDriver
+from drivers.chrome import create_chrome_driver
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+import threading
+
+"""
+Bounded pool of WebDrivers so several studios can be crawled concurrently.
+Drivers are created lazily (never more than `size`), handed out one per worker
+and reused by the next studio once released. A factory with a `release(driver)`
+method (see `DriverProvider`) is told when one of its drivers quit.
+"""
+
+
+class DriverPool:
+    def __init__(
+        self, size: int = 1, factory: Callable[[], WebDriver] = create_chrome_driver
+    ):
+        if size < 1:
+            raise ValueError(f"driver pool size must be at least 1, got {size}")
+        self.size = size
+        self.factory = factory
+        self._idle: List[WebDriver] = []
+        self._drivers: List[WebDriver] = []
+        # number of live drivers, including ones still starting up
+        self._count = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> WebDriver:
+        """
+        return an idle driver, starting a new one if the pool is not yet full,
+        otherwise block until another worker releases its driver
+        """
+        with self._cond:
+            while not self._idle and self._count >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._count += 1
+
+        # start the browser outside the lock, it can take several seconds
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._drivers.append(driver)
+        return driver
+
+    def release(self, driver: WebDriver) -> None:
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+    def discard(self, driver: WebDriver) -> None:
+        """
+        quit a driver left in an unknown state so its slot can be refilled with a
+        fresh browser. The slot only frees up once the driver quit, so its
+        replacement cannot race it for the same browser profile.
+        """
+        self._quit(driver)
+        with self._cond:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+                self._count -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def driver(self) -> Iterator[WebDriver]:
+        driver = self.acquire()
+        try:
+            yield driver
+        except Exception:
+            self.discard(driver)
+            raise
+        self.release(driver)
+
+    def close(self) -> None:
+        with self._cond:
+            drivers = self._drivers
+            self._drivers = []
+            self._idle = []
+            self._count = 0
+        for driver in drivers:
+            self._quit(driver)
+
+    def _quit(self, driver: WebDriver) -> None:
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"error quitting driver: {e}")
+        release = getattr(self.factory, "release", None)
+        if release is not None:
+            release(driver)
@@ -0,0 +1,156 @@
+from selenium.webdriver.remote.webdriver import WebDriver
+from drivers.chrome import CrawlProfile, chrome_arguments, create_chrome_driver
+from drivers.command_counter import CommandCounter
+from metrics import metrics
+from typing import List, Optional, Set
+from urllib.request import urlopen
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+"""
+Driver provider used as the DriverPool factory.
+
+Each pool slot gets its own persistent Chrome profile directory (profiles cannot be
+shared between running browsers), so static assets stay cached and dismissed
+popups stay dismissed between runs. With `keep_alive`, every slot's browser is
+started once as a detached process listening on its own debugging port and later
+crawl invocations attach to it instead of cold-starting Chrome.
+
+A slot is taken from the free ones for each new driver and only handed out again
+once its driver was released, so a replacement for a discarded driver never lands
+on a profile or port still in use by another worker.
+
+Startup time of every driver is recorded in `startup_times`, and each driver
+carries a `command_counter` counting its WebDriver commands.
+"""
+
+# remote debugging requires a non-default profile directory
+DEFAULT_PROFILE_DIR = ".chrome-profiles"
+
+CHROME_BINARIES = (
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+)
+
+
+def find_chrome_binary() -> str:
+    pinned = os.getenv("CHROME_BINARY")
+    if pinned:
+        return pinned
+    for candidate in CHROME_BINARIES:
+        path = shutil.which(candidate) or (
+            candidate if os.path.exists(candidate) else None
+        )
+        if path:
+            return path
+    raise FileNotFoundError("no Chrome binary found, set CHROME_BINARY")
+
+
+def browser_listening(port: int) -> bool:
+    try:
+        with urlopen(f"http://127.0.0.1:{port}/json/version", timeout=1):
+            return True
+    except Exception:
+        return False
+
+
+class DriverProvider:
+    def __init__(
+        self,
+        profile: CrawlProfile,
+        slots: int = 1,
+        profile_dir: Optional[str] = None,
+        keep_alive: bool = False,
+        base_port: int = 9222,
+    ):
+        self.profile = profile
+        self.slots = slots
+        if profile_dir is None and keep_alive:
+            profile_dir = DEFAULT_PROFILE_DIR
+        self.profile_dir = profile_dir
+        self.keep_alive = keep_alive
+        self.base_port = base_port
+        self.startup_times: List[float] = []
+        self._free_slots: Set[int] = set(range(slots))
+        self._lock = threading.Lock()
+
+    def __call__(self) -> WebDriver:
+        with self._lock:
+            if not self._free_slots:
+                raise RuntimeError(f"all {self.slots} driver slots are in use")
+            slot = min(self._free_slots)
+            self._free_slots.remove(slot)
+        try:
+            driver = self._start(slot)
+        except Exception:
+            self._release_slot(slot)
+            raise
+        driver.slot = slot
+        return driver
+
+    def release(self, driver: WebDriver) -> None:
+        """
+        return the slot of a driver that quit, called by the pool
+        """
+        slot = getattr(driver, "slot", None)
+        if slot is not None:
+            self._release_slot(slot)
+
+    def _release_slot(self, slot: int) -> None:
+        with self._lock:
+            self._free_slots.add(slot)
+
+    def _start(self, slot: int) -> WebDriver:
+        start = time.monotonic()
+        user_data_dir = self._user_data_dir(slot)
+        if self.keep_alive:
+            port = self.base_port + slot
+            warm = browser_listening(port)
+            if not warm:
+                self._launch_browser(port, user_data_dir)
+            driver = create_chrome_driver(
+                self.profile, debugger_address=f"127.0.0.1:{port}"
+            )
+        else:
+            warm = user_data_dir is not None and os.path.isdir(user_data_dir)
+            driver = create_chrome_driver(self.profile, user_data_dir=user_data_dir)
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self.startup_times.append(elapsed)
+        metrics.observe("driver_startup", elapsed, warm=warm)
+        # commands issued through this driver, read per studio by the crawler
+        driver.command_counter = CommandCounter()
+        driver.command_counter.attach(driver)
+        print(f"driver {slot} started in {elapsed:.2f}s ({'warm' if warm else 'cold'})")
+        return driver
+
+    def _user_data_dir(self, slot: int) -> Optional[str]:
+        if self.profile_dir is None:
+            return None
+        return os.path.abspath(os.path.join(self.profile_dir, f"driver-{slot}"))
+
+    def _launch_browser(self, port: int, user_data_dir: Optional[str], timeout=15):
+        """
+        start a detached browser that outlives this process, listening on `port`
+        """
+        command = [find_chrome_binary(), f"--remote-debugging-port={port}"]
+        command += chrome_arguments(self.profile)
+        if user_data_dir is not None:
+            command.append(f"--user-data-dir={user_data_dir}")
+        subprocess.Popen(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + timeout
+        while not browser_listening(port):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"browser on port {port} did not start")
+            time.sleep(0.2)
@@ -0,0 +1,236 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Iterable, List, Optional, Set, Tuple
+import json
+import os
+import random
+import smtplib
+import ssl
+import threading
+import time
+
+"""
+Email delivery pipeline for the weekly update.
+
+Messages are sent over a small pool of SMTP connections (one per worker thread),
+throttled to a configurable rate to stay within Gmail's quotas. Transient failures
+are retried per recipient with exponential backoff, a rejected login stops the whole
+run, and every outcome is appended
+to a JSON-lines progress log so that a rerun of the same campaign skips recipients
+that already received their email.
+
+`emails/local_smtp.py` runs a local stand-in server for trying this out and
+measuring throughput without sending real mail.
+"""
+
+
+@dataclass
+class DeliveryReport:
+    sent: int = 0
+    skipped: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+
+class RateLimiter:
+    """
+    thread-safe limiter spacing calls at least 1 / `per_second` seconds apart
+    """
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class DeliveryLog:
+    """
+    append-only record of delivery outcomes for one campaign
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def delivered(self) -> Set[str]:
+        if not os.path.exists(self.path):
+            return set()
+        delivered = set()
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # a line cut short by an interrupted run
+                    continue
+                if entry.get("status") == "sent":
+                    delivered.add(entry["recipient"])
+        return delivered
+
+    def record(self, recipient: str, status: str, error: Optional[str] = None) -> None:
+        entry = {"recipient": recipient, "status": status, "time": time.time()}
+        if error is not None:
+            entry["error"] = error
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 4xx replies are temporary, 5xx are permanent rejections
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # SMTPException derives from OSError, other SMTP errors such as refused
+    # recipients or unsupported commands fail the same way on every attempt
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class SmtpDelivery:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        password: Optional[str] = None,
+        use_ssl: bool = True,
+        pool_size: int = 3,
+        per_second: float = 1.0,
+        max_retries: int = 3,
+        backoff: float = 2.0,
+        log_path: str = "email_progress.jsonl",
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.use_ssl = use_ssl
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limiter = RateLimiter(per_second)
+        self.log = DeliveryLog(log_path)
+        self._local = threading.local()
+        self._connections: List[smtplib.SMTP] = []
+        self._connections_lock = threading.Lock()
+        # set once the server rejected the login, every later delivery would too
+        self._login_error: Optional[smtplib.SMTPAuthenticationError] = None
+
+    def send_all(self, messages: Iterable[Tuple[str, EmailMessage]]) -> DeliveryReport:
+        """
+        deliver (recipient, message) pairs, skipping recipients already recorded as
+        sent in the progress log. `messages` is consumed lazily with only a few
+        messages in flight, so sending starts as soon as the first one is produced.
+        Raises `smtplib.SMTPAuthenticationError` when the login is rejected, leaving
+        the remaining recipients for a rerun.
+        """
+        report = DeliveryReport()
+        delivered = self.log.delivered()
+        self._login_error = None
+
+        def tally(futures):
+            for future in futures:
+                if future.result():
+                    report.sent += 1
+                else:
+                    report.failed += 1
+
+        start = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+                in_flight = set()
+                for recipient, message in messages:
+                    if recipient in delivered:
+                        report.skipped += 1
+                        continue
+                    if len(in_flight) >= 2 * self.pool_size:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        tally(done)
+                    in_flight.add(executor.submit(self._deliver, recipient, message))
+                tally(wait(in_flight).done)
+        finally:
+            self._close_connections()
+        report.elapsed = time.monotonic() - start
+        print(
+            f"emails sent: {report.sent}, skipped: {report.skipped}, "
+            f"failed: {report.failed} ({report.rate:.1f}/s)"
+        )
+        return report
+
+    def _deliver(self, recipient: str, message: EmailMessage) -> bool:
+        for attempt in range(self.max_retries + 1):
+            if self._login_error is not None:
+                raise self._login_error
+            self.limiter.wait()
+            try:
+                self._connection().send_message(message, self.sender, [recipient])
+                self.log.record(recipient, "sent")
+                return True
+            except smtplib.SMTPAuthenticationError as e:
+                print(f"SMTP login rejected, stopping delivery: {e}")
+                self._login_error = e
+                self._drop_connection()
+                raise
+            except Exception as e:
+                # the connection may be unusable, open a fresh one on retry
+                self._drop_connection()
+                if not is_transient(e) or attempt == self.max_retries:
+                    print(f"failed sending email to {recipient}: {e}")
+                    self.log.record(recipient, "failed", str(e))
+                    return False
+                time.sleep(self.backoff * (2**attempt) * (1 + random.random()))
+        return False
+
+    def _connection(self) -> smtplib.SMTP:
+        smtp = getattr(self._local, "smtp", None)
+        if smtp is None:
+            if self.use_ssl:
+                context = ssl.create_default_context()
+                smtp = smtplib.SMTP_SSL(self.host, self.port, context=context)
+            else:
+                smtp = smtplib.SMTP(self.host, self.port)
+            if self.password:
+                smtp.login(self.sender, self.password)
+            self._local.smtp = smtp
+            with self._connections_lock:
+                self._connections.append(smtp)
+        return smtp
+
+    def _drop_connection(self) -> None:
+        smtp = getattr(self._local, "smtp", None)
+        self._local.smtp = None
+        if smtp is not None:
+            with self._connections_lock:
+                if smtp in self._connections:
+                    self._connections.remove(smtp)
+            _close(smtp)
+
+    def _close_connections(self) -> None:
+        with self._connections_lock:
+            connections = self._connections
+            self._connections = []
+        for smtp in connections:
+            _close(smtp)
+        self._local = threading.local()
+
+
+def _close(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except Exception:
+        pass
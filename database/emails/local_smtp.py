@@ -0,0 +1,59 @@
+import argparse
+import threading
+import time
+
+"""
+Local stand-in SMTP server for exercising and benchmarking the email delivery
+pipeline without sending real mail. Requires the `aiosmtpd` package.
+
+    python -m emails.local_smtp --port 8025
+
+then point weekly_email.py at it with `smtp-host=localhost`, `smtp-port=8025` and
+`smtp-ssl=false`, leaving `app-password` unset.
+"""
+
+
+class CountingHandler:
+    """
+    aiosmtpd handler that accepts every message and counts deliveries
+    """
+
+    def __init__(self):
+        self.received = 0
+        self.recipients = []
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.received += 1
+            self.recipients.extend(envelope.rcpt_tos)
+        return "250 Message accepted for delivery"
+
+
+def start_local_smtp(host: str = "localhost", port: int = 8025):
+    """
+    start the server in a background thread, returns (controller, handler). Call
+    `controller.stop()` when done.
+    """
+    from aiosmtpd.controller import Controller
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+    return controller, handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink.")
+    parser.add_argument("--host", type=str, default="localhost")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    controller, handler = start_local_smtp(args.host, args.port)
+    print(f"local SMTP server listening on {args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"messages received: {handler.received}")
+    except KeyboardInterrupt:
+        controller.stop()
@@ -0,0 +1,122 @@
+from studios.session import Session, SessionBatch, local_time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import re
+
+"""
+Preference matching for the weekly email.
+
+The week's sessions are indexed once by studio, weekday, instructor and the word
+tokens of their name and level. A user's preferences then resolve to a handful of
+set intersections instead of a scan over every class, and users sharing the same
+preferences reuse the cached result. The cache keeps the most recently used
+preference sets only, so memory stays flat however many users there are.
+
+Preferences follow the `Preferences` shape saved by the web app:
+{instructor: str, level: str, style: str, dayOfWeek: [str], studio: [str]}
+where empty values place no constraint.
+"""
+
+# normalized (studios, days, instructor, level tokens, style tokens)
+PreferenceKey = Tuple[
+    FrozenSet[str], FrozenSet[str], str, FrozenSet[str], FrozenSet[str]
+]
+
+# distinct preference sets whose matches are kept
+MAX_CACHED_PREFERENCES = 1024
+
+
+def tokenize(text: Optional[str]) -> FrozenSet[str]:
+    return frozenset(re.findall(r"\w+", (text or "").lower()))
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def preference_key(preferences: Dict) -> PreferenceKey:
+    return (
+        frozenset(preferences.get("studio") or ()),
+        frozenset(preferences.get("dayOfWeek") or ()),
+        normalize(preferences.get("instructor")),
+        tokenize(preferences.get("level")),
+        tokenize(preferences.get("style")),
+    )
+
+
+class SessionIndex:
+    def __init__(
+        self,
+        batches: Dict[str, SessionBatch],
+        cache_size: int = MAX_CACHED_PREFERENCES,
+    ):
+        self.sessions: List[Session] = []
+        self.by_studio: Dict[str, Set[int]] = {}
+        self.by_weekday: Dict[str, Set[int]] = {}
+        self.by_instructor: Dict[str, Set[int]] = {}
+        self.by_token: Dict[str, Set[int]] = {}
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[PreferenceKey, List[Session]]" = OrderedDict()
+
+        for studio, batch in batches.items():
+            for session in batch:
+                i = len(self.sessions)
+                self.sessions.append(session)
+                self.by_studio.setdefault(studio, set()).add(i)
+                weekday = local_time(session.start_time).strftime("%A")
+                self.by_weekday.setdefault(weekday, set()).add(i)
+                instructor = normalize(session.instructor)
+                self.by_instructor.setdefault(instructor, set()).add(i)
+                tokens = tokenize(session.session_name) | tokenize(session.level)
+                for token in tokens:
+                    self.by_token.setdefault(token, set()).add(i)
+        self.all = set(range(len(self.sessions)))
+
+    def match(self, preferences: Dict) -> List[Session]:
+        """
+        return the sessions satisfying every non-empty preference, ordered by start
+        time
+        """
+        key = preference_key(preferences)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        matched = self._resolve(*key)
+        if self.cache_size > 0:
+            self._cache[key] = matched
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return matched
+
+    def _resolve(
+        self,
+        studios: FrozenSet[str],
+        days: FrozenSet[str],
+        instructor: str,
+        level: FrozenSet[str],
+        style: FrozenSet[str],
+    ) -> List[Session]:
+        candidates: List[Set[int]] = []
+        if studios:
+            candidates.append(self._union(self.by_studio, studios))
+        if days:
+            candidates.append(self._union(self.by_weekday, days))
+        if instructor:
+            candidates.append(self.by_instructor.get(instructor, set()))
+        for token in level | style:
+            candidates.append(self.by_token.get(token, set()))
+
+        if not candidates:
+            matched = self.all
+        else:
+            # intersect starting from the most selective constraint
+            candidates.sort(key=len)
+            matched = candidates[0].intersection(*candidates[1:])
+        return sorted((self.sessions[i] for i in matched), key=lambda s: s.start_time)
+
+    @staticmethod
+    def _union(index: Dict[str, Set[int]], keys: Iterable[str]) -> Set[int]:
+        matched: Set[int] = set()
+        for key in keys:
+            matched |= index.get(key, set())
+        return matched
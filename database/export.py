@@ -0,0 +1,153 @@
+from firestore.snapshot import iso_week
+from studios.session import SESSION_FIELDS, SessionBatch, local_time
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+import csv
+import json
+import os
+
+"""
+Export of crawled sessions for analytics, outside of Firestore.
+
+- "parquet" / "arrow": a dataset partitioned by studio and ISO week
+  (`{out_dir}/{format}/studio=BDC/week=2026-W42/{crawl date}-0.parquet`), with
+  dictionary-encoded string columns. Every crawl adds its own file to each
+  partition, so months of runs can be scanned together and deduplicated on
+  `crawled_on`.
+- "csv" / "ndjson": one flat file per crawl (`{out_dir}/sessions_{crawl date}.csv`),
+  written row by row.
+
+Parquet and Arrow need `pyarrow`, which is imported only when they are requested.
+"""
+
+EXPORT_FORMATS = ("parquet", "arrow", "csv", "ndjson")
+COLUMNS = ("studio", "week", *SESSION_FIELDS, "crawled_on")
+# low-cardinality columns stored as dictionaries
+DICTIONARY_COLUMNS = (
+    "studio",
+    "week",
+    "session_name",
+    "instructor",
+    "level",
+    "location",
+    "url",
+)
+
+
+def _week(start_time: datetime) -> str:
+    return iso_week(local_time(start_time))
+
+
+def _rows(batches: Iterable[SessionBatch], crawled_on: date) -> Iterable[dict]:
+    for batch in batches:
+        for session in batch:
+            row = {"studio": batch.studio, "week": _week(session.start_time)}
+            for name in SESSION_FIELDS:
+                value = getattr(session, name)
+                row[name] = value.isoformat() if isinstance(value, datetime) else value
+            row["crawled_on"] = crawled_on.isoformat()
+            yield row
+
+
+def write_csv(batches: Iterable[SessionBatch], path: str, crawled_on: date) -> int:
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in _rows(batches, crawled_on):
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def write_ndjson(batches: Iterable[SessionBatch], path: str, crawled_on: date) -> int:
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in _rows(batches, crawled_on):
+            f.write(json.dumps(row) + "\n")
+            written += 1
+    return written
+
+
+def to_arrow_table(batches: Iterable[SessionBatch], crawled_on: date):
+    """
+    build an Arrow table column by column from the batches
+    """
+    import pyarrow as pa
+
+    columns = {name: [] for name in COLUMNS}
+    for batch in batches:
+        starts = batch.column("start_time")
+        columns["studio"] += [batch.studio] * len(batch)
+        columns["week"] += [_week(start) for start in starts]
+        for name in SESSION_FIELDS:
+            columns[name] += batch.column(name)
+        columns["crawled_on"] += [crawled_on] * len(batch)
+
+    timestamp = pa.timestamp("us", tz="America/New_York")
+    arrays = {}
+    for name, values in columns.items():
+        if name in ("start_time", "end_time"):
+            arrays[name] = pa.array(values, type=timestamp)
+        elif name == "crawled_on":
+            arrays[name] = pa.array(values, type=pa.date32())
+        else:
+            arrays[name] = pa.array(values, type=pa.string())
+            if name in DICTIONARY_COLUMNS:
+                arrays[name] = arrays[name].dictionary_encode()
+    return pa.table(arrays)
+
+
+def write_dataset(
+    batches: Iterable[SessionBatch],
+    root: str,
+    crawled_on: date,
+    format: str = "parquet",
+    basename: Optional[str] = None,
+) -> int:
+    """
+    write the sessions under `root` partitioned by studio and week, in files named
+    after `basename` (the crawl date by default). Files of an earlier write with
+    the same name are replaced, others are kept.
+    """
+    import pyarrow.dataset as ds
+
+    table = to_arrow_table(batches, crawled_on)
+    if table.num_rows == 0:
+        return 0
+    extension = "parquet" if format == "parquet" else "arrow"
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet" if format == "parquet" else "ipc",
+        partitioning=["studio", "week"],
+        partitioning_flavor="hive",
+        basename_template=f"{basename or crawled_on.isoformat()}-{{i}}.{extension}",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return table.num_rows
+
+
+def export_sessions(
+    batches: List[SessionBatch],
+    formats: Iterable[str],
+    out_dir: str,
+    crawled_on: Optional[date] = None,
+) -> None:
+    crawled_on = crawled_on or date.today()
+    os.makedirs(out_dir, exist_ok=True)
+    for format in formats:
+        if format in ("parquet", "arrow"):
+            path = os.path.join(out_dir, format)
+            written = write_dataset(batches, path, crawled_on, format)
+        elif format == "csv":
+            path = os.path.join(out_dir, f"sessions_{crawled_on.isoformat()}.csv")
+            written = write_csv(batches, path, crawled_on)
+        elif format == "ndjson":
+            path = os.path.join(out_dir, f"sessions_{crawled_on.isoformat()}.ndjson")
+            written = write_ndjson(batches, path, crawled_on)
+        else:
+            raise ValueError(
+                f"unknown export format {format!r}, expected one of {EXPORT_FORMATS}"
+            )
+        print(f"exported {written} sessions as {format} to: {path}")
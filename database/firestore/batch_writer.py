@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import random
+import time
+
+"""
+Batched Firestore writer. Operations are queued with `set` / `delete`, grouped into
+WriteBatches of up to 500 operations (the Firestore limit) and committed
+concurrently, retrying each batch with exponential backoff. Results are counted per
+label (e.g. studio name) so callers can report written/failed documents.
+
+Only `db.batch()` and document references are used, so any client exposing the same
+interface (the Firestore emulator or an in-memory fake) can be passed in.
+"""
+
+MAX_BATCH_SIZE = 500
+
+
+@dataclass
+class WriteResult:
+    written: int = 0
+    failed: int = 0
+
+
+# (label, "set" | "delete", document reference, data)
+Operation = Tuple[str, str, object, Optional[dict]]
+
+
+class BatchWriter:
+    def __init__(
+        self,
+        db,
+        batch_size: int = MAX_BATCH_SIZE,
+        workers: int = 4,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+    ):
+        if not 1 <= batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(
+                f"batch size must be between 1 and {MAX_BATCH_SIZE}, got {batch_size}"
+            )
+        self.db = db
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._operations: List[Operation] = []
+
+    def set(self, doc_ref, data: dict, label: str = "") -> None:
+        self._operations.append((label, "set", doc_ref, data))
+
+    def delete(self, doc_ref, label: str = "") -> None:
+        self._operations.append((label, "delete", doc_ref, None))
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    def commit(self) -> Dict[str, WriteResult]:
+        """
+        commit every queued operation and return written/failed counts per label
+        """
+        operations, self._operations = self._operations, []
+        chunks = [
+            operations[i : i + self.batch_size]
+            for i in range(0, len(operations), self.batch_size)
+        ]
+        results: Dict[str, WriteResult] = {}
+        for label, _, _, _ in operations:
+            results.setdefault(label, WriteResult())
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            outcomes = executor.map(self._commit_chunk, chunks)
+            for chunk, committed in zip(chunks, outcomes):
+                for label, _, _, _ in chunk:
+                    if committed:
+                        results[label].written += 1
+                    else:
+                        results[label].failed += 1
+        return results
+
+    def _commit_chunk(self, chunk: List[Operation]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            # a batch cannot be reused after a failed commit, rebuild it each attempt
+            batch = self.db.batch()
+            for _, kind, doc_ref, data in chunk:
+                if kind == "set":
+                    batch.set(doc_ref, data)
+                else:
+                    batch.delete(doc_ref)
+            try:
+                batch.commit()
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"giving up on batch of {len(chunk)} writes: {e}")
+                    return False
+                delay = self.backoff * (2**attempt) * (1 + random.random())
+                print(f"batch commit failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return False
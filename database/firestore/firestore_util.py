@@ -1,5 +1,7 @@
 import firebase_admin
 from firebase_admin import firestore, credentials
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import firestore as cloud_firestore
 import os
 
 
@@ -13,6 +15,13 @@ class Firebase:
 
     def create_firebase_admin(self):
         try:
+            if os.getenv("FIRESTORE_EMULATOR_HOST"):
+                # the emulator accepts any project id and needs no service account;
+                # anonymous credentials keep the client from looking up default ones
+                project_id = os.getenv("GCLOUD_PROJECT", "danceatlasnyc")
+                return cloud_firestore.Client(
+                    project=project_id, credentials=AnonymousCredentials()
+                )
             cred = credentials.Certificate(self.authentication_path)
             app = firebase_admin.initialize_app(cred)
             db = firestore.client()
@@ -0,0 +1,24 @@
+from typing import Iterator, List
+
+"""
+Cursor-based pagination over Firestore queries, so large collections are read one
+page at a time instead of being materialized in full.
+"""
+
+
+def iter_pages(query, page_size: int = 500) -> Iterator[List]:
+    """
+    yield successive lists of up to `page_size` document snapshots of `query`,
+    ordered by document id and resumed from the last document of the previous page
+    """
+    query = query.order_by("__name__").limit(page_size)
+    last = None
+    while True:
+        page_query = query.start_after(last) if last is not None else query
+        page = list(page_query.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
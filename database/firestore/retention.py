@@ -0,0 +1,271 @@
+from firestore.batch_writer import BatchWriter
+from firestore.sessions import SESSIONS_COLLECTION, flat_id
+from firestore.snapshot import SNAPSHOT_COLLECTION, iso_week
+from studios.session import Session, SessionBatch, edt_timezone
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import gzip
+import json
+import time
+
+"""
+Retention job for past classes. Date collections under `classes/{studio}` that
+are older than the cutoff are folded into one compressed document per studio and
+month, `archives/{studio}_{YYYY-MM}`:
+
+{
+  studio: "BDC",
+  month: "2024-07",
+  count: 812,
+  sessions: gzip(JSON { date: { id: session } })
+}
+
+optionally also written to a local Parquet dataset (see `export.py`). The
+originals, their copies in the flat `sessions` collection and the weekly
+snapshots of past weeks are then deleted in batches. Deletes only happen once the
+month's archive is written, and archives of a month are merged when the job runs
+again, so it can be rerun at any time.
+
+Run `python -m firestore.retention --dry-run` to see what would be archived; set
+`FIRESTORE_EMULATOR_HOST` to try it against the emulator.
+"""
+
+ARCHIVE_COLLECTION = "archives"
+# Firestore documents are limited to 1 MiB, leave room for the other fields
+MAX_ARCHIVE_BYTES = 1_000_000
+
+
+@dataclass
+class RetentionReport:
+    studio: str
+    months: int = 0
+    dates: int = 0
+    documents: int = 0
+    raw_bytes: int = 0
+    archived_bytes: int = 0
+    deleted: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+
+def _serialize(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def encode_archive(dates: Dict[str, Dict[str, dict]]) -> bytes:
+    return gzip.compress(json.dumps(dates, default=_serialize).encode("utf-8"))
+
+
+def decode_archive(blob: bytes) -> Dict[str, Dict[str, dict]]:
+    """
+    sessions of an archive document by date and document id, times as datetimes
+    """
+    dates = json.loads(gzip.decompress(blob).decode("utf-8"))
+    for sessions in dates.values():
+        for session in sessions.values():
+            for name in ("start_time", "end_time"):
+                if isinstance(session.get(name), str):
+                    session[name] = datetime.fromisoformat(session[name])
+    return dates
+
+
+def archive_id(studio: str, month: str) -> str:
+    return f"{studio}_{month}"
+
+
+class RetentionJob:
+    def __init__(
+        self,
+        db,
+        cutoff: date,
+        dry_run: bool = False,
+        archive_dir: Optional[str] = None,
+        writer: Optional[BatchWriter] = None,
+    ):
+        """
+        `cutoff` is the first date kept, every date collection before it is
+        archived and deleted
+        """
+        self.db = db
+        self.cutoff = cutoff.isoformat()
+        self.dry_run = dry_run
+        self.archive_dir = archive_dir
+        self.writer = writer or BatchWriter(db)
+
+    def run(self, studios: Optional[Iterable[str]] = None) -> List[RetentionReport]:
+        if studios is None:
+            studios = [doc.id for doc in self.db.collection("classes").list_documents()]
+        reports = [self.compact_studio(studio) for studio in studios]
+        for report in reports:
+            print(
+                f"{report.studio}: {report.dates} dates in {report.months} months, "
+                f"{report.documents} documents, {report.raw_bytes / 1024:.0f} KiB as JSON, "
+                f"{report.archived_bytes / 1024:.0f} KiB archived, {report.deleted} deleted, "
+                f"{report.failed} failed ({report.seconds:.1f}s)"
+            )
+        snapshots = self.drop_past_snapshots()
+        print(
+            f"{snapshots.documents} past weekly snapshots, {snapshots.deleted} deleted, "
+            f"{snapshots.failed} failed ({snapshots.seconds:.1f}s)"
+        )
+        return reports + [snapshots]
+
+    def compact_studio(self, studio: str) -> RetentionReport:
+        start = time.monotonic()
+        report = RetentionReport(studio)
+        studio_ref = self.db.collection("classes").document(studio)
+        months: Dict[str, list] = {}
+        for coll in studio_ref.collections():
+            if coll.id < self.cutoff:
+                months.setdefault(coll.id[:7], []).append(coll)
+
+        for month, collections in sorted(months.items()):
+            dates = {
+                coll.id: {doc.id: doc.to_dict() for doc in coll.stream()}
+                for coll in collections
+            }
+            report.months += 1
+            report.dates += len(dates)
+            report.documents += sum(len(sessions) for sessions in dates.values())
+            report.raw_bytes += len(json.dumps(dates, default=_serialize))
+            try:
+                report.archived_bytes += self.archive_month(studio, month, dates)
+            except Exception as e:
+                # leave the originals in place when the archive could not be written
+                print(f"skipping {studio} {month}: {e}")
+                report.failed += sum(len(sessions) for sessions in dates.values())
+                continue
+            if self.archive_dir is not None and not self.dry_run:
+                self.export_month(studio, month, dates)
+            if self.dry_run:
+                continue
+            for day, sessions in dates.items():
+                for id in sessions:
+                    self.writer.delete(studio_ref.collection(day).document(id), studio)
+                    self.writer.delete(
+                        self.db.collection(SESSIONS_COLLECTION).document(
+                            flat_id(studio, id)
+                        ),
+                        studio,
+                    )
+
+        if not self.dry_run:
+            result = self.writer.commit().get(studio)
+            if result is not None:
+                report.deleted += result.written
+                report.failed += result.failed
+        report.seconds = time.monotonic() - start
+        return report
+
+    def archive_month(
+        self, studio: str, month: str, dates: Dict[str, Dict[str, dict]]
+    ) -> int:
+        """
+        merge `dates` into the studio's archive of `month` and return the size of
+        the compressed archive
+        """
+        archive_ref = self.db.collection(ARCHIVE_COLLECTION).document(
+            archive_id(studio, month)
+        )
+        merged: Dict[str, Dict[str, dict]] = {}
+        existing = archive_ref.get()
+        if existing.exists:
+            merged = decode_archive((existing.to_dict() or {})["sessions"])
+        for day, sessions in dates.items():
+            merged.setdefault(day, {}).update(sessions)
+
+        blob = encode_archive(merged)
+        if len(blob) > MAX_ARCHIVE_BYTES:
+            raise ValueError(
+                f"archive of {len(blob)} bytes exceeds {MAX_ARCHIVE_BYTES} bytes"
+            )
+        if not self.dry_run:
+            archive_ref.set(
+                {
+                    "studio": studio,
+                    "month": month,
+                    "count": sum(len(sessions) for sessions in merged.values()),
+                    "sessions": blob,
+                }
+            )
+        return len(blob)
+
+    def export_month(
+        self, studio: str, month: str, dates: Dict[str, Dict[str, dict]]
+    ) -> None:
+        from export import write_dataset
+
+        batch = SessionBatch(
+            studio,
+            (
+                Session.from_dict(session)
+                for _, sessions in sorted(dates.items())
+                for session in sessions.values()
+            ),
+        )
+        # named after the dates archived, which later runs never archive again, so
+        # no file of an earlier run (or month, for weeks spanning two) is replaced
+        write_dataset(
+            [batch],
+            self.archive_dir,
+            date.today(),
+            basename=f"archive-{min(dates)}-{max(dates)}",
+        )
+
+    def drop_past_snapshots(self) -> RetentionReport:
+        """
+        delete weekly snapshots of weeks that ended before the cutoff
+        """
+        start = time.monotonic()
+        report = RetentionReport(SNAPSHOT_COLLECTION)
+        cutoff_week = iso_week(date.fromisoformat(self.cutoff))
+        query = self.db.collection(SNAPSHOT_COLLECTION).where("week", "<", cutoff_week)
+        for doc in query.stream():
+            report.documents += 1
+            if not self.dry_run:
+                self.writer.delete(doc.reference, SNAPSHOT_COLLECTION)
+        if not self.dry_run:
+            result = self.writer.commit().get(SNAPSHOT_COLLECTION)
+            if result is not None:
+                report.deleted += result.written
+                report.failed += result.failed
+        report.seconds = time.monotonic() - start
+        return report
+
+
+if __name__ == "__main__":
+    import argparse
+    from firestore.firestore_util import Firebase
+
+    parser = argparse.ArgumentParser(
+        description="Archive past classes into monthly documents and delete the originals."
+    )
+    parser.add_argument(
+        "--keep-days",
+        type=int,
+        default=7,
+        help="Days before today that are left in place. Defaults to 7.",
+    )
+    parser.add_argument("--studios", nargs="*", default=None)
+    parser.add_argument(
+        "--archive-dir",
+        type=str,
+        default=None,
+        help="Also write the archived sessions to a local Parquet dataset in this directory.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be archived and deleted.",
+    )
+    args = parser.parse_args()
+    today = datetime.now(edt_timezone).date()
+    RetentionJob(
+        Firebase().create_firebase_admin(),
+        today - timedelta(days=args.keep_days),
+        dry_run=args.dry_run,
+        archive_dir=args.archive_dir,
+    ).run(args.studios)
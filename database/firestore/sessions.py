@@ -0,0 +1,131 @@
+from firestore.batch_writer import BatchWriter
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from studios.session import Session, SessionBatch, local_time
+
+"""
+Flat, range-queryable copy of every stored class. Besides
+`classes/{studio}/{date}/{id}`, each session is written to
+`sessions/{studio}_{id}`:
+
+{
+  studio: "BDC",
+  date: "2024-07-01",
+  weekday: "Monday",
+  start_time: timestamp,
+  ...the session's own fields
+}
+
+so readers can ask for upcoming classes with one range query on `start_time`
+(optionally per studio, weekday or instructor, see the composite indexes in
+`dance-atlas-nyc/firestore.indexes.json`) instead of listing every date
+collection ever written.
+
+Run `python -m firestore.sessions` once to backfill the collection from the
+per-class layout.
+"""
+
+SESSIONS_COLLECTION = "sessions"
+# `in` filters take at most 30 values
+MAX_IN_VALUES = 30
+
+
+def flat_id(studio: str, id: str) -> str:
+    return f"{studio}_{id}"
+
+
+def flat_document(studio: str, session: Session) -> dict:
+    document = session.to_dict()
+    document["studio"] = studio
+    start_time = local_time(session.start_time)
+    document["date"] = start_time.strftime("%Y-%m-%d")
+    document["weekday"] = start_time.strftime("%A")
+    return document
+
+
+def read_sessions_from(
+    db, studios: Iterable[str], start: datetime, end: Optional[datetime] = None
+) -> Dict[str, SessionBatch]:
+    """
+    load the classes of `studios` starting at or after `start` (and before `end`)
+    into one batch per studio, ordered by start time
+    """
+    results = {studio: SessionBatch(studio) for studio in studios}
+    names = sorted(results)
+    for i in range(0, len(names), MAX_IN_VALUES):
+        query = (
+            db.collection(SESSIONS_COLLECTION)
+            .where("studio", "in", names[i : i + MAX_IN_VALUES])
+            .where("start_time", ">=", start)
+        )
+        if end is not None:
+            query = query.where("start_time", "<", end)
+        for doc in query.order_by("start_time").stream():
+            document = doc.to_dict()
+            results[document["studio"]].append(Session.from_dict(document))
+    return results
+
+
+def backfill(
+    db,
+    studios: Optional[Iterable[str]] = None,
+    since: Optional[str] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    copy the per-class documents of `studios` (every studio by default) dated on
+    or after `since` (YYYY-MM-DD) into the flat collection. Listing the date
+    collections is the cost this collection avoids, so this is meant to run once.
+    Returns the number of documents copied (or to copy, with `dry_run`) per studio.
+    """
+    writer = BatchWriter(db)
+    flat = db.collection(SESSIONS_COLLECTION)
+    if studios is None:
+        studios = [doc.id for doc in db.collection("classes").list_documents()]
+    counts = {}
+    for studio in studios:
+        counts[studio] = 0
+        for coll in db.collection("classes").document(studio).collections():
+            if since is not None and coll.id < since:
+                continue
+            for doc in coll.stream():
+                counts[studio] += 1
+                if not dry_run:
+                    session = Session.from_dict(doc.to_dict())
+                    writer.set(
+                        flat.document(flat_id(studio, doc.id)),
+                        flat_document(studio, session),
+                        studio,
+                    )
+        if dry_run:
+            print(f"{studio}: {counts[studio]} sessions to copy")
+            continue
+        # commit per studio to bound the queued writes
+        result = writer.commit().get(studio)
+        written, failed = (result.written, result.failed) if result else (0, 0)
+        print(f"{studio}: {written} written, {failed} failed")
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+    from firestore.firestore_util import Firebase
+
+    parser = argparse.ArgumentParser(
+        description="Backfill the flat sessions collection from classes/{studio}/{date}."
+    )
+    parser.add_argument("--studios", nargs="*", default=None)
+    parser.add_argument(
+        "--since",
+        type=str,
+        default=None,
+        help="Only copy dates on or after this one (YYYY-MM-DD), e.g. today to skip history.",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    backfill(
+        Firebase().create_firebase_admin(),
+        studios=args.studios,
+        since=args.since,
+        dry_run=args.dry_run,
+    )
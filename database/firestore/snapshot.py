@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+from studios.session import Session, SessionBatch, edt_timezone
+from firestore.sessions import read_sessions_from
+
+"""
+Denormalized weekly schedule snapshots. Besides the per-class documents under
+`classes/{studio}/{date}`, the crawler publishes one document per studio and ISO
+week at `schedules/{week}_{studio}`:
+
+{
+  studio: "BDC",
+  week: "2024-W27",
+  dates: { "2024-07-01": [session, ...], ... },
+  updated_at: timestamp
+}
+
+so readers can load every upcoming class with a single query instead of listing
+and reading each date collection. Readers fall back to the flat `sessions`
+collection for studios without a snapshot. Only complete crawls are published;
+after an incomplete one the studio's upcoming snapshots are removed instead, so
+readers do not keep serving classes the crawl has since updated.
+"""
+
+SNAPSHOT_COLLECTION = "schedules"
+
+
+def iso_week(day: datetime) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def snapshot_id(week: str, studio: str) -> str:
+    return f"{week}_{studio}"
+
+
+def build_week_snapshots(studio: str, sessions: Iterable[Session]) -> Dict[str, dict]:
+    """
+    group a studio's sessions into one snapshot document per ISO week, keyed by
+    document id
+    """
+    weeks: Dict[str, Dict[str, List[dict]]] = {}
+    for session in sorted(sessions, key=lambda s: s.start_time):
+        start_time = session.start_time
+        date = start_time.strftime("%Y-%m-%d")
+        weeks.setdefault(iso_week(start_time), {}).setdefault(date, []).append(
+            session.to_dict()
+        )
+
+    updated_at = datetime.now(timezone.utc)
+    return {
+        snapshot_id(week, studio): {
+            "studio": studio,
+            "week": week,
+            "dates": dates,
+            "updated_at": updated_at,
+        }
+        for week, dates in weeks.items()
+    }
+
+
+def upcoming_snapshots(db, studio: str, today: str) -> List:
+    """
+    references of a studio's snapshots of the week of `today` (YYYY-MM-DD) and later
+    """
+    current_week = iso_week(datetime.strptime(today, "%Y-%m-%d"))
+    query = db.collection(SNAPSHOT_COLLECTION).where("week", ">=", current_week)
+    return [
+        doc.reference for doc in query.stream() if doc.to_dict().get("studio") == studio
+    ]
+
+
+def read_upcoming_classes(
+    db, studios: Iterable[str], today: str
+) -> Dict[str, SessionBatch]:
+    """
+    load classes on or after `today` (YYYY-MM-DD) into one batch per studio, from
+    the weekly snapshots where available and the flat sessions collection
+    otherwise
+    """
+    results: Dict[str, SessionBatch] = {
+        studio: SessionBatch(studio) for studio in studios
+    }
+    current_week = iso_week(datetime.strptime(today, "%Y-%m-%d"))
+    snapshot_studios = set()
+    query = db.collection(SNAPSHOT_COLLECTION).where("week", ">=", current_week)
+    for doc in query.stream():
+        snapshot = doc.to_dict()
+        studio = snapshot.get("studio")
+        if studio not in results:
+            continue
+        snapshot_studios.add(studio)
+        for date, classes in sorted(snapshot.get("dates", {}).items()):
+            if date >= today:
+                results[studio].extend(Session.from_dict(c) for c in classes)
+
+    missing = results.keys() - snapshot_studios
+    if missing:
+        start = datetime.strptime(today, "%Y-%m-%d").replace(tzinfo=edt_timezone)
+        results.update(read_sessions_from(db, missing, start))
+    return results
@@ -0,0 +1,169 @@
+from firestore.batch_writer import BatchWriter
+from firestore.sessions import SESSIONS_COLLECTION, flat_document, flat_id
+from studios.session import Session
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+import hashlib
+import json
+
+"""
+Incremental sync of crawled sessions. A manifest per studio
+(`sync_manifests/{studio}`) maps every stored date to the content hash of each
+document under `classes/{studio}/{date}`. Each run only queues writes for new or
+changed documents and deletes documents that vanished from a crawled date, e.g.
+cancelled classes. Every write is mirrored to the flat `sessions` collection.
+
+A studio is synced in one go with `plan`, or part by part as it is crawled with
+`begin`, `add` for each part and `finish` once the crawl is over.
+"""
+
+MANIFEST_COLLECTION = "sync_manifests"
+
+# (date collection, document id) -> session
+KeyedSessions = Dict[Tuple[str, str], Session]
+
+
+@dataclass
+class SyncPlan:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    # documents committed so far, see `SessionSync.commit`
+    written: int = 0
+    failed: int = 0
+    manifest: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    # the manifest stored before this sync
+    previous: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+
+def content_hash(session: Session) -> str:
+    def serialize(obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return str(obj)
+
+    payload = json.dumps(session.to_dict(), sort_keys=True, default=serialize)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SessionSync:
+    def __init__(self, db, writer: BatchWriter):
+        self.db = db
+        self.writer = writer
+
+    def load_manifest(self, studio: str) -> Dict[str, Dict[str, str]]:
+        snapshot = self.db.collection(MANIFEST_COLLECTION).document(studio).get()
+        if not snapshot.exists:
+            return {}
+        return (snapshot.to_dict() or {}).get("dates", {})
+
+    def save_manifest(self, studio: str, manifest: Dict[str, Dict[str, str]]) -> None:
+        self.db.collection(MANIFEST_COLLECTION).document(studio).set(
+            {"dates": manifest}
+        )
+
+    def plan(
+        self,
+        studio: str,
+        sessions: KeyedSessions,
+        allow_deletes: bool = True,
+        rewrite: bool = False,
+        keep_dates: Iterable[str] = (),
+    ) -> SyncPlan:
+        """
+        queue the writes needed to bring `classes/{studio}` in line with `sessions`
+        and return the counts along with the manifest to save once they commit.
+
+        Only dates within the crawled window are diffed, so past dates are left
+        alone. Deletes are skipped when `allow_deletes` is False (e.g. the crawl
+        failed part way and its absence of a class means nothing), and for the
+        `keep_dates` whose schedule could not be read. `rewrite` writes every
+        session even when its hash is unchanged.
+        """
+        plan = self.begin(studio)
+        self.add(studio, plan, sessions, rewrite)
+        self.finish(studio, plan, allow_deletes, keep_dates)
+        return plan
+
+    def begin(self, studio: str) -> SyncPlan:
+        """
+        start syncing a studio whose sessions arrive in parts
+        """
+        return SyncPlan(previous=self.load_manifest(studio))
+
+    def add(
+        self,
+        studio: str,
+        plan: SyncPlan,
+        sessions: KeyedSessions,
+        rewrite: bool = False,
+    ) -> None:
+        """
+        queue the writes for the new or changed documents among `sessions`
+        """
+        studio_ref = self.db.collection("classes").document(studio)
+        flat = self.db.collection(SESSIONS_COLLECTION)
+        for (date, id), session in sessions.items():
+            digest = content_hash(session)
+            old_digest = plan.previous.get(date, {}).get(id)
+            plan.manifest.setdefault(date, {})[id] = digest
+            if old_digest == digest and not rewrite:
+                plan.unchanged += 1
+                continue
+            if old_digest is None:
+                plan.inserted += 1
+            else:
+                plan.updated += 1
+            self.writer.set(
+                studio_ref.collection(date).document(id), session.to_dict(), studio
+            )
+            self.writer.set(
+                flat.document(flat_id(studio, id)),
+                flat_document(studio, session),
+                studio,
+            )
+
+    def finish(
+        self,
+        studio: str,
+        plan: SyncPlan,
+        allow_deletes: bool = True,
+        keep_dates: Iterable[str] = (),
+    ) -> None:
+        """
+        queue the deletes of documents that vanished from the dates added so far
+        and carry the rest of the previous manifest over, see `plan`
+        """
+        if not plan.manifest:
+            return
+        studio_ref = self.db.collection("classes").document(studio)
+        flat = self.db.collection(SESSIONS_COLLECTION)
+        keep_dates = set(keep_dates)
+        first_date = min(plan.manifest)
+        last_date = max(plan.manifest)
+        for date, hashes in plan.previous.items():
+            if not first_date <= date <= last_date:
+                # keep history outside the crawled window, drop dates already past
+                if date >= datetime.today().strftime("%Y-%m-%d"):
+                    plan.manifest.setdefault(date, dict(hashes))
+                continue
+            for id, digest in hashes.items():
+                if id in plan.manifest.get(date, {}):
+                    continue
+                if allow_deletes and date not in keep_dates:
+                    plan.deleted += 1
+                    self.writer.delete(studio_ref.collection(date).document(id), studio)
+                    self.writer.delete(flat.document(flat_id(studio, id)), studio)
+                else:
+                    plan.manifest.setdefault(date, {})[id] = digest
+
+    def commit(self, studio: str, plan: SyncPlan) -> None:
+        """
+        commit the queued writes and count them in `plan`
+        """
+        result = self.writer.commit().get(studio)
+        if result is not None:
+            plan.written += result.written
+            plan.failed += result.failed
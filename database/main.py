@@ -1,123 +1,444 @@
+from crawl_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL_HOURS, CrawlCache
+from export import EXPORT_FORMATS, export_sessions
 from firestore.firestore_util import Firebase
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from firestore.batch_writer import MAX_BATCH_SIZE, BatchWriter
+from firestore.sync import SessionSync, SyncPlan
+from firestore.snapshot import (
+    SNAPSHOT_COLLECTION,
+    build_week_snapshots,
+    upcoming_snapshots,
+)
+from drivers.driver_pool import DriverPool
+from drivers.chrome import PROFILES
+from drivers.provider import DriverProvider
+from metrics import metrics
 from studios.base_studio_handler import BaseStudioHandler
-from studios.peridance import PeriDanceCrawler
-from studios.modega import ModegaCrawler
-from studios.bdc import BDCCrawler
-from studios.brickhouse import BrickhouseCrawler
-from studios.ild_manhattan import ILDManhattanCrawler
-from selenium import webdriver
+from studios.session import Session, SessionBatch, edt_timezone
+from studios.spec import crawler_class, load_studio_specs
 
 
 import argparse
-from typing import Dict, Literal
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from queue import Queue
+from typing import Callable, Dict, Iterable, List, Literal, Optional, Set, Tuple
 import json
+import os
 import re
+import threading
 from datetime import datetime
 import warnings
 
-studio_crawlers = {
-    "Peri": PeriDanceCrawler,
-    "Modega": ModegaCrawler,
-    "BDC": BDCCrawler,
-    "Brickhouse": BrickhouseCrawler,
-    "ILoveDanceManhattan": ILDManhattanCrawler,
-}
+# crawlers are compiled from the studio specs in site_data.json
+studio_specs = load_studio_specs()
 
+studio_urls = {studio: spec.url for studio, spec in studio_specs.items()}
 
-studio_urls = {
-    "Peri": "https://www.peridance.com/open-classes",
-    "Modega": "https://sutrapro.com/modega",
-    "BDC": "https://broadwaydancecenter.com/schedule/schedule-in-person",
-    "Brickhouse": "https://brickhousedance.com/open-classes/",
-    "ILoveDanceManhattan": "https://www.ilovedancenyc.com/instudio-classesmanhattan",
-}
+# crawled days waiting to be stored, per crawl worker
+QUEUED_DAYS_PER_WORKER = 8
 
 studio_mapping: Dict[str, Dict[str, object]] = {
-    studio: {"crawler": studio_crawlers[studio], "url": studio_urls[studio]}
-    for studio in studio_crawlers.keys() & studio_urls.keys()
+    studio: {"crawler": crawler_class(spec), "url": spec.url}
+    for studio, spec in studio_specs.items()
 }
 
 
 class StudioCrawler:
-    def __init__(self, studios: Dict[str, Dict[str, object]], mode: str) -> None:
+    def __init__(
+        self,
+        studios: Dict[str, Dict[str, object]],
+        mode: str,
+        workers: int = 1,
+        html_dir: Optional[str] = None,
+        full_sync: bool = False,
+        profile: str = "lean",
+        profile_dir: Optional[str] = None,
+        keep_browser: bool = False,
+        metrics_json: Optional[str] = None,
+        prometheus: Optional[str] = None,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        cache_ttl: float = DEFAULT_TTL_HOURS,
+        only: Optional[Iterable[str]] = None,
+        refresh: Iterable[str] = (),
+        tabs: Optional[int] = None,
+        horizon_days: Optional[int] = None,
+        export_formats: Iterable[str] = (),
+        export_dir: str = "exports",
+    ) -> None:
         self.studios = studios
         self.mode = mode
-        self.driver = self._initialize_driver()
+        self.workers = workers
+        self.html_dir = html_dir
+        self.full_sync = full_sync
+        self.metrics_json = metrics_json
+        self.prometheus = prometheus
+        self.cache = CrawlCache(cache_dir, cache_ttl)
+        # studios crawled even when cached, None meaning every uncached studio
+        self.only: Optional[Set[str]] = set(only) if only is not None else None
+        self.refresh: Set[str] = set(refresh)
+        self.cached: Set[str] = set()
+        # overrides the tabs per studio declared in site_data.json
+        self.tabs = tabs
+        self.horizon_days = horizon_days
+        self.export_formats = list(export_formats)
+        self.export_dir = export_dir
+        # one driver per worker, started lazily as studios are picked up
+        self.driver_provider = DriverProvider(
+            PROFILES[profile],
+            slots=workers,
+            profile_dir=profile_dir,
+            keep_alive=keep_browser,
+        )
+        self.driver_pool = DriverPool(workers, self.driver_provider)
         self.crawlers = self._initialize_crawlers()
+        self.failures: Dict[str, Exception] = {}
         self.db = Firebase().create_firebase_admin()
 
-    def _initialize_driver(self) -> webdriver.Chrome:
-        options = webdriver.ChromeOptions()
-        # Uncomment the following line if headless mode is required
-        # options.add_argument('--headless=new')
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--ignore-certificate-errors")
-        options.add_argument("--ignore-ssl-errors")
-        user_agent = (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
-        )
-        options.add_argument(f"user-agent={user_agent}")
-
-        # Use ChromeDriverManager to install and manage the ChromeDriver executable
-        driver_path = ChromeDriverManager().install()
-        return webdriver.Chrome(service=Service(driver_path), options=options)
-
     def _initialize_crawlers(self) -> Dict[str, BaseStudioHandler]:
         """
         Initializes and returns a dictionary of crawler instances for each studio.
+        Drivers are bound from the driver pool when each crawler is run.
         """
-        return {
-            studio_name: studio_data["crawler"](self.driver, studio_data["url"])
-            for studio_name, studio_data in self.studios.items()
-        }
+        crawlers = {}
+        for studio_name, studio_data in self.studios.items():
+            crawler = studio_data["crawler"](None, studio_data["url"])
+            crawler.data = SessionBatch(studio_name)
+            if self.tabs is not None:
+                crawler.day_tabs = self.tabs
+            crawler.horizon_days = self.horizon_days
+            crawlers[studio_name] = crawler
+        return crawlers
 
+    @staticmethod
     def date_serializer(obj):
         if isinstance(obj, datetime):
             return obj.isoformat()  # Convert datetime to ISO format string
         raise TypeError(f"Type {type(obj)} not serializable")
 
     def main(self):
-        print(f'crawling studios: {self.studios.keys()}')
-        self.crawlSessions()
-
+        print(f"crawling studios: {self.studios.keys()}")
         if self.mode == "prod":
-            self.store()
+            self.crawl_and_store()
         else:
+            self.crawlSessions()
             devOutputFile = "dev_output.json"
             try:
                 with open(devOutputFile, "w") as f:
-                    json.dump(self.data, f, default=self.date_serializer)
+                    output = {
+                        studio: crawler.data.to_records()
+                        for studio, crawler in self.crawlers.items()
+                    }
+                    json.dump(output, f, default=self.date_serializer)
                     print(f"dev outputs written to: {devOutputFile}")
             except Exception as e:
                 print(f"error saving dev outputs: {e}")
+        if self.export_formats:
+            with metrics.span("export"):
+                export_sessions(
+                    [crawler.data for crawler in self.crawlers.values()],
+                    self.export_formats,
+                    self.export_dir,
+                )
+        self.write_metrics()
+
+    def write_metrics(self):
+        if self.metrics_json is not None:
+            metrics.write_json(self.metrics_json)
+            print(f"metrics written to: {self.metrics_json}")
+        if self.prometheus is not None:
+            metrics.write_prometheus(self.prometheus)
+            print(f"prometheus metrics written to: {self.prometheus}")
+
+    def crawlSessions(
+        self,
+        on_crawled: Optional[Callable[[str], None]] = None,
+        on_sessions: Optional[Callable[[str, List[Session]], None]] = None,
+    ):
+        """
+        Crawls every studio on a pool of `self.workers` drivers. Each studio runs on
+        its own driver, failures are collected per studio instead of aborting the run.
+        Studios with a fresh cache entry are loaded from it instead, unless selected
+        with `refresh`; with `only`, the remaining studios are never crawled.
+
+        `on_sessions` is called with a studio's name and its sessions as they become
+        available: a day at a time while a browser crawl goes on, all at once from
+        the cache or a static crawl. `on_crawled` is called with each studio's name
+        once all of its sessions were handed out (its crawl finished or failed).
+        Both are called on the worker that crawled the studio.
+        """
+        self.failures = {}
+        pending = self._load_cached()
+        for studio in self.cached:
+            if on_sessions is not None:
+                on_sessions(studio, list(self.crawlers[studio].data))
+            if on_crawled is not None:
+                on_crawled(studio)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    executor.submit(
+                        self._run_studio, studio, crawler, on_crawled, on_sessions
+                    )
+                    for studio, crawler in pending.items()
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            self.driver_pool.close()
+
+        startup_times = self.driver_provider.startup_times
+        if startup_times:
+            print(
+                f"started {len(startup_times)} drivers, "
+                f"{sum(startup_times):.1f}s total startup time"
+            )
+        for studio, crawler in self.crawlers.items():
+            if studio in self.failures:
+                status = "failed"
+            elif studio in self.cached:
+                status = "cached"
+            elif studio not in pending:
+                status = "skipped"
+            else:
+                status = "ok"
+            waited = sum(wait["seconds"] for wait in crawler.wait_log)
+            print(
+                f"{studio}: {len(crawler.data)} sessions ({status}), "
+                f"{waited:.1f}s spent waiting on the page"
+            )
 
-    def crawlSessions(self):
+    def _load_cached(self) -> Dict[str, BaseStudioHandler]:
+        """
+        fills crawlers from the crawl cache where possible and returns the ones that
+        still need crawling
+        """
+        self.cached = set()
+        pending = {}
+        window = crawl_window(self.horizon_days)
         for studio, crawler in self.crawlers.items():
+            selected = self.only is None or studio in self.only
+            if studio not in self.refresh:
+                cached = self.cache.load(studio, crawler.url, window)
+                if cached is not None:
+                    crawler.data = cached
+                    self.cached.add(studio)
+                    continue
+            if selected or studio in self.refresh:
+                pending[studio] = crawler
+        return pending
+
+    def _run_studio(
+        self,
+        studio: str,
+        crawler: BaseStudioHandler,
+        on_crawled: Optional[Callable[[str], None]],
+        on_sessions: Optional[Callable[[str, List[Session]], None]],
+    ) -> None:
+        on_day = partial(on_sessions, studio) if on_sessions is not None else None
+        try:
+            self._crawl_studio(studio, crawler, on_day)
+        except Exception as e:
+            self.failures[studio] = e
+            warnings.warn(f"Error while crawling {studio}: {str(e)}")
+        if on_crawled is not None:
+            on_crawled(studio)
+
+    def _crawl_studio(
+        self,
+        studio: str,
+        crawler: BaseStudioHandler,
+        on_day: Optional[Callable[[List[Session]], None]] = None,
+    ) -> None:
+        print(f"crawling {studio}")
+        source = None
+        if self.html_dir is not None:
+            saved_html = os.path.join(self.html_dir, f"{studio}.html")
+            source = saved_html if os.path.exists(saved_html) else None
+        # studios with a static fast path never need a browser
+        if crawler.crawl_static(source):
+            if on_day is not None:
+                on_day(list(crawler.data))
+            self._finish_crawl(studio, crawler)
+            return
+        with self.driver_pool.driver() as driver:
+            crawler.driver = driver
+            counter = getattr(driver, "command_counter", None)
+            if counter is not None:
+                counter.reset()
             try:
-                crawler.crawl()
-            except Exception as e:
-                warnings.warn(f'Error while crawling {studio}: {str(e)}')
+                with metrics.span("crawl", studio=studio):
+                    crawler.crawl(on_day)
+            finally:
+                if counter is not None:
+                    metrics.increment(
+                        "webdriver_commands", counter.total, studio=studio
+                    )
+        self._finish_crawl(studio, crawler)
+
+    def _finish_crawl(self, studio: str, crawler: BaseStudioHandler) -> None:
+        metrics.increment("sessions_crawled", len(crawler.data), studio=studio)
+        # an empty schedule is more likely a broken crawl than a week off, and a
+        # crawl missing days is retried next run rather than reused
+        if len(crawler.data) and crawler.complete:
+            self.cache.save(
+                studio, crawler.url, crawl_window(self.horizon_days), crawler.data
+            )
 
     def store(self):
+        """
+        Stores every studio once crawling is done. `crawl_and_store` overlaps the
+        two phases instead.
+        """
         for studio_name, crawler in self.crawlers.items():
-            studio_ref = self.db.collection("classes").document(studio_name)
-            print(f"storing for {studio_name}")
-            for c in crawler.data:
+            self.store_studio(studio_name, crawler)
+
+    def store_studio(self, studio_name: str, crawler: BaseStudioHandler) -> None:
+        sync, plan = self.begin_store(studio_name)
+        self.store_sessions(studio_name, crawler.data, sync, plan)
+        self.finish_store(studio_name, crawler, sync, plan)
+
+    def begin_store(self, studio_name: str) -> Tuple[SessionSync, SyncPlan]:
+        print(f"storing for {studio_name}")
+        # a writer per studio, so each commit only carries that studio's writes
+        sync = SessionSync(self.db, BatchWriter(self.db))
+        return sync, sync.begin(studio_name)
+
+    def store_sessions(
+        self,
+        studio_name: str,
+        sessions: Iterable[Session],
+        sync: SessionSync,
+        plan: SyncPlan,
+    ) -> None:
+        """
+        Queues the writes of new or changed sessions, committing whenever a full
+        batch of writes is queued.
+        """
+        keyed = {}
+        for c in sessions:
+            try:
+                keyed[session_key(c)] = c
+            except Exception as e:
+                print(e)
+                print(f"error storing data for studio:  {studio_name}\nentry: {c}")
+        with metrics.span("sync_plan", studio=studio_name):
+            sync.add(studio_name, plan, keyed, rewrite=self.full_sync)
+        if len(sync.writer) >= MAX_BATCH_SIZE:
+            with metrics.span("firestore_commit", studio=studio_name):
+                sync.commit(studio_name, plan)
+
+    def finish_store(
+        self,
+        studio_name: str,
+        crawler: BaseStudioHandler,
+        sync: SessionSync,
+        plan: SyncPlan,
+    ) -> None:
+        """
+        Deletes vanished sessions of a studio once all of its sessions were stored,
+        commits and reports the counts. The studio's sync manifest is only updated
+        once all of its writes have committed. Classes are not deleted for days the
+        crawl could not read, and only studios crawled without failures get their
+        weekly schedule snapshots republished. Readers serve a studio from its
+        snapshots while it has any, so the upcoming ones of a studio whose crawl was
+        incomplete are deleted and readers use the flat sessions written instead.
+        """
+        if not plan.manifest:
+            print(f"no sessions crawled for {studio_name}, leaving stored data as is")
+            return
+        crawled_fully = studio_name not in self.failures and crawler.complete
+        with metrics.span("sync_plan", studio=studio_name):
+            sync.finish(
+                studio_name,
+                plan,
+                allow_deletes=studio_name not in self.failures and not crawler.partial,
+                keep_dates=[day.isoformat() for day in crawler.failed_dates],
+            )
+        if crawled_fully:
+            sessions = {session_key(c): c for c in crawler.data}
+            snapshots = build_week_snapshots(studio_name, sessions.values())
+            for doc_id, snapshot in snapshots.items():
+                snapshot_ref = self.db.collection(SNAPSHOT_COLLECTION).document(doc_id)
+                sync.writer.set(snapshot_ref, snapshot, studio_name)
+        else:
+            today = datetime.now(edt_timezone).strftime("%Y-%m-%d")
+            for snapshot_ref in upcoming_snapshots(self.db, studio_name, today):
+                sync.writer.delete(snapshot_ref, studio_name)
+
+        with metrics.span("firestore_commit", studio=studio_name):
+            sync.commit(studio_name, plan)
+        metrics.increment("documents_written", plan.written, studio=studio_name)
+        metrics.increment("documents_failed", plan.failed, studio=studio_name)
+        print(
+            f"{studio_name}: {plan.inserted} inserted, {plan.updated} updated, "
+            f"{plan.deleted} deleted, {plan.unchanged} unchanged, {plan.failed} failed"
+        )
+        if plan.failed == 0:
+            sync.save_manifest(studio_name, plan.manifest)
+
+    def crawl_and_store(self):
+        """
+        Stores sessions while the crawls are still running, on a separate thread:
+        each day a crawler finishes is handed over right away and its writes are
+        committed in full batches, and deletes follow once the studio's crawl is
+        over. Handed-over days wait in a bounded queue: when storing falls behind,
+        the crawl workers block until it catches up.
+        """
+        # (studio, sessions), or (studio, None) once the studio's crawl is over
+        crawled: "Queue[Optional[Tuple[str, Optional[List[Session]]]]]" = Queue(
+            maxsize=QUEUED_DAYS_PER_WORKER * self.workers
+        )
+
+        def store_crawled():
+            stores: Dict[str, Tuple[SessionSync, SyncPlan]] = {}
+            while True:
+                item = crawled.get()
+                if item is None:
+                    return
+                studio, sessions = item
                 try:
-                    date = c["start_time"].strftime("%Y-%m-%d")
-                    # create composite key from datetime and session name
-                    id = date + re.sub(r"[^\w]", "_", c["session_name"])
-                    studio_ref.collection(date).document(id).set(c)
+                    if studio not in stores:
+                        stores[studio] = self.begin_store(studio)
+                    if sessions is None:
+                        sync, plan = stores.pop(studio)
+                        self.finish_store(studio, self.crawlers[studio], sync, plan)
+                    else:
+                        self.store_sessions(studio, sessions, *stores[studio])
                 except Exception as e:
-                    print(e)
-                    print(f"error storing data for studio:  {studio_name}\nentry: {c}")
+                    warnings.warn(f"Error while storing {studio}: {str(e)}")
+
+        storer = threading.Thread(target=store_crawled, name="store")
+        storer.start()
+        try:
+            self.crawlSessions(
+                on_crawled=lambda studio: crawled.put((studio, None)),
+                on_sessions=lambda studio, sessions: crawled.put((studio, sessions)),
+            )
+        finally:
+            crawled.put(None)
+            storer.join()
+
+
+def crawl_window(horizon_days: Optional[int] = None) -> str:
+    """
+    identifies the dates a crawl covers, i.e. the schedule from today onwards up to
+    the horizon
+    """
+    today = datetime.now(edt_timezone).date().isoformat()
+    return today if horizon_days is None else f"{today}+{horizon_days}d"
+
 
+def session_key(session: Session) -> Tuple[str, str]:
+    """
+    returns the date collection and document id a session is stored under
+    """
+    date = session.start_time.strftime("%Y-%m-%d")
+    # create composite key from datetime and session name
+    id = date + re.sub(r"[^\w]", "_", session.session_name)
+    return date, id
 
-def parse_arguments() -> Literal["prod", "dev"]:
+
+def parse_arguments() -> argparse.Namespace:
 
     parser = argparse.ArgumentParser(description="Run the Studio Crawler script.")
     parser.add_argument(
@@ -127,12 +448,132 @@ def parse_arguments() -> Literal["prod", "dev"]:
         default="dev",
         help='Mode to run the crawler. Choose between "prod" and "dev". Defaults to "dev".',
     )
-    args = parser.parse_args()
-    return args.mode
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of studios crawled concurrently, each on its own browser. Defaults to 1.",
+    )
+    parser.add_argument(
+        "--html-dir",
+        type=str,
+        default=None,
+        help="Directory of saved <studio>.html schedule pages parsed instead of fetching the live widget.",
+    )
+    parser.add_argument(
+        "--full-sync",
+        action="store_true",
+        help="Rewrite every crawled session instead of only new or changed ones.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        choices=["lean", "full"],
+        default="lean",
+        help='Browser profile. "lean" runs headless with images, trackers, fonts and media blocked; "full" loads everything in a visible window. Defaults to "lean".',
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default=None,
+        help="Directory of persistent Chrome profiles (one per worker) reused between runs for a warm cache.",
+    )
+    parser.add_argument(
+        "--keep-browser",
+        action="store_true",
+        help="Leave each worker's browser running after the crawl and attach to it on the next run.",
+    )
+    parser.add_argument(
+        "--tabs",
+        type=int,
+        default=None,
+        help="Tabs per browser loading different days at once for studios clicking through a calendar. Defaults to the studio's tabs in site_data.json.",
+    )
+    parser.add_argument(
+        "--horizon-days",
+        type=int,
+        default=None,
+        help="Days of schedule to crawl from today, e.g. 28 for four weeks. Defaults to what each studio shows by default.",
+    )
+    parser.add_argument(
+        "--export",
+        type=str,
+        nargs="+",
+        choices=EXPORT_FORMATS,
+        default=[],
+        help="Also export the crawled sessions in these formats: Parquet or Arrow datasets partitioned by studio and week, or flat CSV / NDJSON files.",
+    )
+    parser.add_argument(
+        "--export-dir",
+        type=str,
+        default="exports",
+        help='Directory exports are written to. Defaults to "exports".',
+    )
+    parser.add_argument(
+        "--metrics-json",
+        type=str,
+        default=None,
+        help="Write timings and counters of the run (per phase and studio) to this JSON file.",
+    )
+    parser.add_argument(
+        "--prometheus",
+        type=str,
+        default=None,
+        help="Write the same metrics in the Prometheus text format, e.g. for the node exporter textfile collector.",
+    )
+    parser.add_argument(
+        "--only",
+        type=str,
+        nargs="+",
+        choices=sorted(studio_mapping),
+        default=None,
+        help="Only crawl these studios when they are not cached (see --refresh); the others are taken from the crawl cache when it has them and left out otherwise.",
+    )
+    parser.add_argument(
+        "--refresh",
+        type=str,
+        nargs="+",
+        choices=sorted(studio_mapping),
+        default=[],
+        help="Re-crawl these studios even when the crawl cache has a fresh entry.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help=f'Directory of the crawl cache. Defaults to "{DEFAULT_CACHE_DIR}".',
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL_HOURS,
+        help=f"Hours a cached crawl stays fresh, 0 disables the cache. Defaults to {DEFAULT_TTL_HOURS:g}.",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    mode: Literal["prod", "dev"] = parse_arguments()
+    args = parse_arguments()
+    mode: Literal["prod", "dev"] = args.mode
     print(f"Running in mode (defaults to dev): {mode}")
-    crawler = StudioCrawler(studio_mapping, mode)
+    crawler = StudioCrawler(
+        studio_mapping,
+        mode,
+        workers=args.workers,
+        html_dir=args.html_dir,
+        full_sync=args.full_sync,
+        profile=args.profile,
+        profile_dir=args.profile_dir,
+        keep_browser=args.keep_browser,
+        metrics_json=args.metrics_json,
+        prometheus=args.prometheus,
+        cache_dir=args.cache_dir,
+        cache_ttl=args.cache_ttl,
+        only=args.only,
+        refresh=args.refresh,
+        tabs=args.tabs,
+        horizon_days=args.horizon_days,
+        export_formats=args.export,
+        export_dir=args.export_dir,
+    )
     crawler.main()
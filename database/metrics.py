@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Tuple
+import json
+import threading
+import time
+
+"""
+Lightweight instrumentation for the crawl pipeline.
+
+`span` times a block (driver startup, page loads, waits, parsing, Firestore
+writes), `observe` records an already measured duration and `increment` bumps a
+counter (WebDriver commands, documents written). Everything is keyed by name and
+labels such as the studio, and can be exported as a JSON report or in the
+Prometheus text format.
+
+A process-wide registry is available as `metrics`.
+"""
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.spans: Dict[Tuple[str, Labels], Dict[str, float]] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **labels)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            span = self.spans.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0})
+            span["count"] += 1
+            span["total"] += seconds
+            span["max"] = max(span["max"], seconds)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "spans": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": span["count"],
+                        "total_seconds": round(span["total"], 3),
+                        "max_seconds": round(span["max"], 3),
+                    }
+                    for (name, labels), span in sorted(self.spans.items())
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+            }
+
+    def prometheus_text(self) -> str:
+        def series(name: str, labels: Labels) -> str:
+            if not labels:
+                return name
+            pairs = ",".join(
+                f'{key}="{value}"'.replace("\n", " ") for key, value in labels
+            )
+            return f"{name}{{{pairs}}}"
+
+        lines = ["# TYPE crawl_span_seconds summary"]
+        with self._lock:
+            for (name, labels), span in sorted(self.spans.items()):
+                labels = (("span", name),) + labels
+                lines.append(
+                    f"{series('crawl_span_seconds_sum', labels)} {span['total']}"
+                )
+                lines.append(
+                    f"{series('crawl_span_seconds_count', labels)} {span['count']}"
+                )
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE crawl_{name}_total counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{series(f'crawl_{name}_total', labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_prometheus(self, path: str) -> None:
+        with open(path, "w") as f:
+            f.write(self.prometheus_text())
+
+
+metrics = Metrics()
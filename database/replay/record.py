@@ -0,0 +1,97 @@
+from studios.base_studio_handler import BaseStudioHandler
+from drivers.chrome import PROFILES, create_chrome_driver
+from selenium.webdriver.common.by import By
+from datetime import datetime
+from typing import Dict
+import argparse
+import json
+import os
+
+"""
+Records offline fixtures of the studio pages for replay and benchmarking.
+
+For each studio the rendered page, the rendered document of each iframe and the
+text responses the page fetched in the background (widget markup, api JSON) are
+written under `<out>/<studio>/` together with a `manifest.json`:
+
+{
+  studio, url, recorded_at,
+  page: "page.html",
+  frames: ["frame-0.html", ...],
+  responses: [{url, file}, ...]
+}
+"""
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# responses larger than this are almost never schedule data
+MAX_RESPONSE_SIZE = 2_000_000
+
+
+def record_studio(driver, studio: str, url: str, out_dir: str) -> Dict:
+    studio_dir = os.path.join(out_dir, studio)
+    os.makedirs(os.path.join(studio_dir, "responses"), exist_ok=True)
+
+    handler = BaseStudioHandler(driver, url)
+    handler.visit_url()
+    handler.wait_for_dom_quiet(quiet_ms=1000, timeout=30)
+
+    manifest = {
+        "studio": studio,
+        "url": url,
+        "recorded_at": datetime.now().isoformat(),
+        "page": "page.html",
+        "frames": [],
+        "responses": [],
+    }
+    _write(os.path.join(studio_dir, "page.html"), driver.page_source)
+
+    frames = driver.find_elements(By.TAG_NAME, "iframe")
+    for n, frame in enumerate(frames):
+        name = f"frame-{n}.html"
+        try:
+            driver.switch_to.frame(frame)
+            _write(os.path.join(studio_dir, name), driver.page_source)
+        except Exception as e:
+            print(f"could not record frame {n} of {studio}: {e}")
+            name = None
+        finally:
+            driver.switch_to.default_content()
+        manifest["frames"].append(name)
+
+    for n, (response_url, body) in enumerate(handler.captured_responses(r".")):
+        if len(body) > MAX_RESPONSE_SIZE:
+            continue
+        name = os.path.join("responses", f"{n}.txt")
+        _write(os.path.join(studio_dir, name), body)
+        manifest["responses"].append({"url": response_url, "file": name})
+
+    _write(os.path.join(studio_dir, "manifest.json"), json.dumps(manifest, indent=2))
+    print(
+        f"recorded {studio}: {len(manifest['frames'])} frames, "
+        f"{len(manifest['responses'])} responses"
+    )
+    return manifest
+
+
+def _write(path: str, content: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+if __name__ == "__main__":
+    from main import studio_urls
+
+    parser = argparse.ArgumentParser(description="Record offline studio fixtures.")
+    parser.add_argument("--out", type=str, default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--studios", nargs="*", default=list(studio_urls))
+    args = parser.parse_args()
+
+    driver = create_chrome_driver(PROFILES["lean"])
+    try:
+        for studio in args.studios:
+            try:
+                record_studio(driver, studio, studio_urls[studio], args.out)
+            except Exception as e:
+                print(f"error recording {studio}: {e}")
+    finally:
+        driver.quit()
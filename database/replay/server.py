@@ -0,0 +1,89 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+import json
+import os
+import threading
+import lxml.html
+
+"""
+Serves recorded fixtures over local HTTP so crawlers can run against them offline.
+
+`/<studio>/` returns the recorded page with scripts and external stylesheets
+removed (the DOM is already rendered, so nothing needs to run or be fetched) and
+every iframe pointed at its recorded document, `/<studio>/frame-<n>.html`.
+
+Background responses are not replayed: with the scripts gone nothing requests
+them, so crawlers fall back from `captured_sessions` to the rendered DOM. The
+recorded bodies can still be read at `/<studio>/responses/<n>.txt`, e.g. to
+inspect an api's payload.
+"""
+
+
+def prepare_document(html: str, studio: str = "", frames=()) -> str:
+    document = lxml.html.fromstring(html)
+    for element in document.xpath("//script | //link[@rel='stylesheet']"):
+        element.drop_tree()
+    for iframe, name in zip(document.xpath("//iframe"), frames):
+        if name is not None:
+            iframe.set("src", f"/{studio}/{name}")
+    return lxml.html.tostring(document, encoding="unicode", doctype="<!DOCTYPE html>")
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    fixtures_dir = ""
+
+    def do_GET(self):
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if not parts or ".." in parts:
+            self.send_error(404)
+            return
+        studio_dir = os.path.join(self.fixtures_dir, parts[0])
+        manifest_path = os.path.join(studio_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            self.send_error(404)
+            return
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        if len(parts) == 1:
+            frames = manifest["frames"]
+            page = self._read(studio_dir, manifest["page"])
+            body = prepare_document(page, parts[0], frames)
+        elif parts[1:] and parts[-1] in manifest["frames"]:
+            body = prepare_document(self._read(studio_dir, parts[-1]))
+        else:
+            path = os.path.join(*parts[1:])
+            if not os.path.exists(os.path.join(studio_dir, path)):
+                self.send_error(404)
+                return
+            body = self._read(studio_dir, path)
+
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+    @staticmethod
+    def _read(studio_dir: str, name: str) -> str:
+        with open(os.path.join(studio_dir, name), encoding="utf-8") as f:
+            return f.read()
+
+
+def serve_fixtures(fixtures_dir: str, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    serve `fixtures_dir` in a background thread, returns the server and its base
+    url. Call `server.shutdown()` when done.
+    """
+    handler = type(
+        "FixtureHandler",
+        (ReplayHandler,),
+        {"fixtures_dir": os.path.abspath(fixtures_dir)},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -1,5 +1,14 @@
 from selenium.webdriver.remote.webdriver import WebDriver
-from typing import List
+from drivers.chrome import apply_blocking
+from studios.session import Session, SessionBatch, edt_timezone
+from metrics import metrics
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+import base64
+import json
+import re
+import time
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
@@ -9,46 +18,548 @@ from selenium.webdriver.support import expected_conditions as EC
 Base studio crawler class with common helper function used to navigate the site and scrap content
 """
 
+# a field selector is either an xpath whose element text is read, or an
+# (xpath, attribute) pair whose attribute value is read instead
+FieldSelector = Union[str, Tuple[str, Optional[str]]]
+
+
+@dataclass(frozen=True)
+class ExtractionPlan:
+    """
+    a container xpath with its fields already in the form `EXTRACT_ALL_SCRIPT`
+    takes, so crawlers reading the same layout repeatedly build it only once
+    """
+
+    container_xpath: str
+    field_specs: Tuple[Tuple[str, str, Optional[str]], ...]
+
+    @classmethod
+    def compile(
+        cls, container_xpath: str, fields: Dict[str, FieldSelector]
+    ) -> "ExtractionPlan":
+        return cls(
+            container_xpath,
+            tuple(
+                (
+                    (name, selector, None)
+                    if isinstance(selector, str)
+                    else (name, *selector)
+                )
+                for name, selector in fields.items()
+            ),
+        )
+
+
+EXTRACT_ALL_SCRIPT = """
+const [containerXPath, fields] = arguments;
+const containers = document.evaluate(
+  containerXPath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+);
+const rows = [];
+for (let i = 0; i < containers.snapshotLength; i++) {
+  const container = containers.snapshotItem(i);
+  const row = {};
+  for (const [name, xpath, attribute] of fields) {
+    const element = document.evaluate(
+      xpath, container, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+    if (element === null) {
+      row[name] = null;
+    } else if (attribute) {
+      row[name] = element.getAttribute(attribute);
+    } else {
+      row[name] = (element.innerText || element.textContent || "").trim();
+    }
+  }
+  rows.push(row);
+}
+return rows;
+"""
+
+# resolves with the name of the first condition whose xpath matches a visible
+# element, or null when none does yet
+FIRST_VISIBLE_SCRIPT = """
+const conditions = arguments[0];
+for (const [name, xpath] of conditions) {
+  const matches = document.evaluate(
+    xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+  );
+  for (let i = 0; i < matches.snapshotLength; i++) {
+    const element = matches.snapshotItem(i);
+    if (element.getClientRects().length > 0) {
+      return name;
+    }
+  }
+}
+return null;
+"""
+
+# resolves true once the DOM has stopped mutating and no new network resources
+# finished loading for `quietMs`, or false when `timeoutMs` elapses first. With
+# `firstChangeMs` set, an update must start within that window (e.g. after a click)
+# before quiet periods count; when nothing changes at all the page is taken as ready.
+DOM_QUIET_SCRIPT = """
+const [quietMs, timeoutMs, firstChangeMs, done] = arguments;
+const resources = () => performance.getEntriesByType("resource").length;
+let seenResources = resources();
+// a change seen since `ARM_CHANGE_SCRIPT` ran counts as the first change
+let changed = firstChangeMs === null || window.__crawlerChanged === true;
+let timer = null;
+const finish = (settled) => {
+  observer.disconnect();
+  if (window.__crawlerArm) window.__crawlerArm.disconnect();
+  window.__crawlerArm = null;
+  window.__crawlerChanged = false;
+  clearTimeout(timer);
+  clearTimeout(limit);
+  done(settled);
+};
+const check = () => {
+  const current = resources();
+  if (current !== seenResources) {
+    seenResources = current;
+    timer = setTimeout(check, quietMs);
+  } else {
+    finish(true);
+  }
+};
+const observer = new MutationObserver(() => {
+  changed = true;
+  clearTimeout(timer);
+  timer = setTimeout(check, quietMs);
+});
+observer.observe(document, {
+  subtree: true, childList: true, attributes: true, characterData: true
+});
+const limit = setTimeout(() => finish(false), timeoutMs);
+timer = setTimeout(check, changed ? quietMs : firstChangeMs);
+"""
+
+# starts recording whether the page (or current frame) changes, so that a
+# `DOM_QUIET_SCRIPT` run later, e.g. after clicking in other tabs meanwhile, knows
+# the update triggered by a click already began
+ARM_CHANGE_SCRIPT = """
+if (window.__crawlerArm) window.__crawlerArm.disconnect();
+window.__crawlerChanged = false;
+window.__crawlerArm = new MutationObserver(() => {
+  window.__crawlerChanged = true;
+});
+window.__crawlerArm.observe(document, {
+  subtree: true, childList: true, attributes: true, characterData: true
+});
+"""
+
 
 class BaseStudioHandler:
-    def __init__(self, driver: WebDriver, url: str):
+    # tabs loading different days at once in crawlers clicking through days, see
+    # `iter_days`
+    day_tabs: int = 1
+    # days from today to crawl, None keeps each crawler's own default
+    horizon_days: Optional[int] = None
+
+    def __init__(self, driver: Optional[WebDriver], url: str):
         self.driver = driver
         self.url = url
-        self.data: List = []
+        self.data = SessionBatch()
+        # how long each wait actually took: {"wait", "seconds", "outcome"}
+        self.wait_log: List[Dict] = []
+        # days of the schedule that could not be read; their stored classes are kept
+        self.failed_dates: Set[date] = set()
+        # part of the schedule failed on a day that is not known, keep every class
+        self.partial = False
+        # the browser crawl ended before the last day of the horizon
+        self.short = False
 
-    
     def visit_url(self):
         """
         start crawling the web page located at the url
         """
+        start = time.monotonic()
         self.driver.get(self.url)
+        self.record_wait("page load", start, "loaded")
+
+    @property
+    def studio(self) -> str:
+        return self.data.studio or type(self).__name__
+
+    @property
+    def complete(self) -> bool:
+        """
+        whether every day of the crawled schedule was read, i.e. classes missing
+        from `self.data` are really gone, up to the end of the horizon
+        """
+        return not self.partial and not self.failed_dates and not self.short
+
+    def record_wait(self, label: str, start: float, outcome: str) -> None:
+        seconds = time.monotonic() - start
+        self.wait_log.append(
+            {"wait": label, "seconds": round(seconds, 3), "outcome": outcome}
+        )
+        metrics.observe(
+            label.replace(" ", "_"), seconds, studio=self.studio, outcome=outcome
+        )
 
     def close_popups(
-        self, button_xpath: str = ".//div[contains(@class, 'close')]", timeout=10
+        self,
+        button_xpath: str = ".//div[contains(@class, 'close')]",
+        timeout=10,
+        content_xpath: Optional[str] = None,
     ):
+        """
+        close a popup if it shows up within `timeout`. With `content_xpath`, the
+        popup is raced against the page content: when the content shows first the
+        popup is assumed absent instead of waiting out the whole timeout.
+        """
         self.driver.switch_to.parent_frame()
-        print(f'closing popup for: {self.url} with selector: {button_xpath}')
+        print(f"closing popup for: {self.url} with selector: {button_xpath}")
+        start = time.monotonic()
         try:
+            if content_xpath is not None:
+                first = self.wait_for_any(
+                    {"popup": button_xpath, "content": content_xpath}, timeout
+                )
+                if first == "content":
+                    print("Content loaded before any popup.")
+                    self.record_wait("popup", start, "content first")
+                    return False
             close_button = WebDriverWait(self.driver, timeout).until(
                 EC.element_to_be_clickable((By.XPATH, button_xpath))
             )
             print("Popup element found. Attempting to close.")
             close_button.click()
             print("Popup closed successfully.")
+            self.record_wait("popup", start, "closed")
             return True
         except TimeoutException:
             print("Popup did not appear.")
+            self.record_wait("popup", start, "timeout")
         except Exception as e:
             print(f"An unexpected error occurred while handling the popup: {e}")
+            self.record_wait("popup", start, "error")
         return False
 
+    def wait_for_any(self, conditions: Dict[str, str], timeout=20) -> str:
+        """
+        wait until one of the named xpaths matches a visible element and return its
+        name. Every poll checks all conditions in a single script call.
+        """
+        specs = [[name, xpath] for name, xpath in conditions.items()]
+        wait = WebDriverWait(self.driver, timeout, poll_frequency=0.1)
+        return wait.until(
+            lambda driver: driver.execute_script(FIRST_VISIBLE_SCRIPT, specs)
+        )
+
+    def wait_for_dom_quiet(
+        self, quiet_ms=300, timeout=20, first_change_ms: Optional[int] = None
+    ) -> bool:
+        """
+        wait for the page (or current frame) to stop changing instead of sleeping a
+        fixed time. Returns False if it was still changing when `timeout` elapsed.
+        """
+        start = time.monotonic()
+        self.driver.set_script_timeout(timeout + 5)
+        settled = self.driver.execute_async_script(
+            DOM_QUIET_SCRIPT, quiet_ms, int(timeout * 1000), first_change_ms
+        )
+        self.record_wait("dom quiet", start, "settled" if settled else "timeout")
+        return settled
+
+    def click_and_settle(self, element, quiet_ms=300, timeout=20) -> bool:
+        """
+        click an element (e.g. a day in a calendar) and wait for the content it
+        triggers to finish rendering
+        """
+        element.click()
+        return self.wait_for_dom_quiet(quiet_ms, timeout, first_change_ms=3000)
+
+    def iter_days(
+        self,
+        locate_days: Callable[[], List],
+        read_day: Callable[[int, str], List[Session]],
+        tabs: int = 1,
+        prepare: Optional[Callable[[], None]] = None,
+        focus: Optional[Callable[[], None]] = None,
+        limit: Optional[int] = None,
+        next_page: Optional[Callable[[], None]] = None,
+    ) -> Iterator[List[Session]]:
+        """
+        click through the day elements returned by `locate_days` and yield the
+        sessions `read_day(i, label)` reads for each day, in day order. `i` counts
+        days across pages and `label` is the text of the clicked day element.
+
+        With `tabs` > 1, that many tabs of the same browser work on consecutive days
+        at once: a day is clicked in every tab first and each tab is read once its
+        day rendered, so the widget loads several days concurrently. New tabs are
+        readied with `prepare` (e.g. closing popups), and `focus` re-enters a tab's
+        schedule after switching to it (e.g. its iframe).
+
+        At most `limit` days are read. When the days of a page run out first,
+        `next_page` moves every tab to the next page (e.g. the next week); paging
+        stops when it raises.
+        """
+        main = self.driver.current_window_handle
+        handles = [main] + self._open_tabs(tabs - 1)
+        days = {}
+        try:
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                if prepare is not None:
+                    prepare()
+                days[handle] = locate_days()
+            if len(handles) > 1:
+                self._switch_to_tab(main, focus)
+            days[main] = locate_days()
+
+            offset = 0
+            while True:
+                total = len(days[main])
+                if limit is not None:
+                    total = min(total, limit - offset)
+                for first in range(0, total, len(handles)):
+                    batch = list(zip(handles, range(first, total)))
+                    labels = {}
+                    for handle, i in batch:
+                        if len(handles) > 1:
+                            self._switch_to_tab(handle, focus)
+                        try:
+                            labels[handle] = self._arm_and_click(days[handle][i])
+                        except Exception:
+                            # the calendar was re-rendered, locate the days again
+                            if prepare is not None:
+                                prepare()
+                            days[handle] = locate_days()
+                            labels[handle] = self._arm_and_click(days[handle][i])
+                    for handle, i in batch:
+                        if len(handles) > 1:
+                            self._switch_to_tab(handle, focus)
+                        self.wait_for_dom_quiet(first_change_ms=3000)
+                        try:
+                            sessions = read_day(offset + i, labels[handle])
+                        except Exception as e:
+                            print(f"errored parsing day {offset + i}: {e}")
+                            self.partial = True
+                            continue
+                        yield sessions
+                offset += total
+                if next_page is None or (limit is not None and offset >= limit):
+                    break
+                try:
+                    for handle in handles:
+                        if len(handles) > 1:
+                            self._switch_to_tab(handle, focus)
+                        next_page()
+                        days[handle] = locate_days()
+                except Exception as e:
+                    print(f"no further pages after {offset} days: {e}")
+                    break
+        finally:
+            if len(handles) > 1:
+                for handle in handles[1:]:
+                    try:
+                        self.driver.switch_to.window(handle)
+                        self.driver.close()
+                    except Exception:
+                        pass
+                self._switch_to_tab(main, focus)
+
+    def _arm_and_click(self, element) -> str:
+        label = element.text
+        self.driver.execute_script(ARM_CHANGE_SCRIPT)
+        element.click()
+        return label
+
+    def click_next_page(self, xpath: str, timeout=5) -> None:
+        """
+        click the pagination control at `xpath` and wait for the next page to render
+        """
+        button = WebDriverWait(self.driver, timeout).until(
+            EC.element_to_be_clickable((By.XPATH, xpath))
+        )
+        self.click_and_settle(button)
+
+    def _open_tabs(self, count: int) -> List[str]:
+        """
+        open `count` tabs on `self.url` without waiting for them to load, so they
+        load concurrently. Returns their window handles.
+        """
+        if count <= 0:
+            return []
+        main = self.driver.current_window_handle
+        profile = getattr(self.driver, "crawl_profile", None)
+        handles = []
+        for _ in range(count):
+            self.driver.switch_to.new_window("tab")
+            if profile is not None:
+                apply_blocking(self.driver, profile)
+            # assigning the location returns right away, unlike `driver.get`
+            self.driver.execute_script("window.location.href = arguments[0];", self.url)
+            handles.append(self.driver.current_window_handle)
+        self.driver.switch_to.window(main)
+        return handles
+
+    def _switch_to_tab(self, handle: str, focus: Optional[Callable[[], None]]) -> None:
+        self.driver.switch_to.window(handle)
+        if focus is not None:
+            focus()
+
     def wait_for_all_visible(self, xpath, timeout=20):
+        start = time.monotonic()
         wait = WebDriverWait(self.driver, timeout)
-        return wait.until(EC.visibility_of_all_elements_located((By.XPATH, xpath)))
+        try:
+            elements = wait.until(
+                EC.visibility_of_all_elements_located((By.XPATH, xpath))
+            )
+        except TimeoutException:
+            self.record_wait("visible", start, "timeout")
+            raise
+        self.record_wait("visible", start, "found")
+        return elements
 
     def wait_for_presence(self, xpath, timeout=20):
+        start = time.monotonic()
         wait = WebDriverWait(self.driver, timeout)
-        return wait.until(EC.presence_of_element_located((By.XPATH, xpath)))
+        try:
+            element = wait.until(EC.presence_of_element_located((By.XPATH, xpath)))
+        except TimeoutException:
+            self.record_wait("presence", start, "timeout")
+            raise
+        self.record_wait("presence", start, "found")
+        return element
+
+    def extract_all(
+        self, container_xpath: str, fields: Dict[str, FieldSelector]
+    ) -> List[Dict[str, Optional[str]]]:
+        """
+        read `fields` from every element matching `container_xpath` in a single
+        script evaluation instead of one WebDriver round-trip per field. Field xpaths
+        are relative to their container, missing elements come back as None.
+        """
+        return self.extract(ExtractionPlan.compile(container_xpath, fields))
+
+    def extract(self, plan: ExtractionPlan) -> List[Dict[str, Optional[str]]]:
+        with metrics.span("extract", studio=self.studio):
+            return self.driver.execute_script(
+                EXTRACT_ALL_SCRIPT, plan.container_xpath, list(plan.field_specs)
+            )
+
+    def captured_responses(self, url_pattern: str) -> List[Tuple[str, str]]:
+        """
+        return (url, body) of every finished network response whose url matches
+        `url_pattern`, read from the DevTools performance log. The log is drained by
+        each call. Returns nothing when the driver was started without performance
+        logging.
+        """
+        try:
+            with metrics.span("capture", studio=self.studio):
+                entries = self.driver.get_log("performance")
+        except Exception as e:
+            print(f"network capture unavailable: {e}")
+            return []
+
+        pattern = re.compile(url_pattern)
+        matched: Dict[str, str] = {}
+        finished = set()
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            params = message.get("params", {})
+            if message["method"] == "Network.responseReceived":
+                url = params["response"]["url"]
+                if pattern.search(url):
+                    matched[params["requestId"]] = url
+            elif message["method"] == "Network.loadingFinished":
+                finished.add(params["requestId"])
+
+        responses = []
+        for request_id, url in matched.items():
+            if request_id not in finished:
+                continue
+            try:
+                response = self.driver.execute_cdp_cmd(
+                    "Network.getResponseBody", {"requestId": request_id}
+                )
+            except Exception as e:
+                # the body may already have been evicted from the browser's buffer
+                print(f"could not read response body of {url}: {e}")
+                continue
+            body = response["body"]
+            if response.get("base64Encoded"):
+                body = base64.b64decode(body).decode("utf-8", errors="replace")
+            responses.append((url, body))
+        return responses
+
+    def captured_sessions(self) -> List[Session]:
+        """
+        after `visit_url`, try to read the sessions from the schedule widget's own
+        network responses instead of navigating and parsing the rendered page.
+        Returns an empty list when that did not work.
+        """
+        return []
+
+    def crawl_static(self, source: Optional[str] = None) -> bool:
+        """
+        try to collect sessions without a browser, optionally from a saved HTML file.
+        Returns True when `self.data` was filled and `crawl` can be skipped.
+        """
+        return False
+
+    def iter_sessions(self) -> Iterator[Session]:
+        """
+        crawl the schedule with the browser, yielding sessions day by day as they are
+        parsed. Sessions yielded before a failure stay with the consumer.
+        """
+        raise NotImplementedError(
+            "Subclasses must implement the `iter_sessions` method."
+        )
+
+    def crawl(self, on_day: Optional[Callable[[List[Session]], None]] = None) -> None:
+        """
+        collect every session within the horizon from `iter_sessions` into
+        `self.data`. `on_day` is handed the sessions of each day as soon as the
+        crawler moves on to the next one, e.g. to store them while crawling goes on,
+        and the last day's once the crawl ends or fails.
+
+        A crawl whose schedule ends before the horizon does (e.g. a calendar that
+        cannot be paged further) is marked `short`, so it is not taken as complete.
+        """
+        day: List[Session] = []
+        last: Optional[date] = None
+        try:
+            for session in self.iter_sessions():
+                if last is None or session.start_time.date() > last:
+                    last = session.start_time.date()
+                if not self.within_horizon(session):
+                    continue
+                self.data.append(session)
+                if on_day is None:
+                    continue
+                if day and day[-1].start_time.date() != session.start_time.date():
+                    on_day(day)
+                    day = []
+                day.append(session)
+        finally:
+            # the last day is handed over even when the crawl fails
+            if day:
+                on_day(day)
+        self.short = self.horizon_days is not None and (
+            last is None or not self.reaches_horizon(last)
+        )
+
+    def horizon_end(self) -> Optional[date]:
+        """
+        first date past the horizon, None when no horizon is set
+        """
+        if self.horizon_days is None:
+            return None
+        return datetime.now(edt_timezone).date() + timedelta(days=self.horizon_days)
+
+    def reaches_horizon(self, day: date) -> bool:
+        """
+        whether a schedule read up to `day` covers the horizon, always the case
+        without one
+        """
+        end = self.horizon_end()
+        return end is None or day >= end - timedelta(days=1)
 
-    def crawl(self) -> None:
-        raise NotImplementedError("Subclasses must implement the `crawl` method.")
+    def within_horizon(self, session: Session) -> bool:
+        end = self.horizon_end()
+        return end is None or session.start_time.date() < end
@@ -0,0 +1,296 @@
+from studios.base_studio_handler import BaseStudioHandler, ExtractionPlan, FieldSelector
+from studios.session import Session, edt_timezone
+from metrics import metrics
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlencode, urljoin
+from urllib.request import Request, urlopen
+import json
+import re
+import lxml.html
+
+"""
+Static-HTML fast path for studios embedding the Healcode / MindBody `bw-widget`
+schedule (BDC, Brickhouse, Peridance, I Love Dance Manhattan).
+
+The widget renders every session as a `bw-session` block carrying `hc_starttime`
+and `hc_endtime` <time> elements, so the same markup can be parsed from raw HTML
+with lxml instead of rendering the page in Chrome and querying it element by
+element over WebDriver. The markup is taken from the studio page itself, from the
+widget's `load_markup` endpoint, or from a saved HTML file.
+"""
+
+SESSION_XPATH = (
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' bw-session ')]"
+)
+SESSION_FIELDS: Dict[str, FieldSelector] = {
+    "start_time": (".//time[contains(@class, 'hc_starttime')]", "datetime"),
+    "end_time": (".//time[contains(@class, 'hc_endtime')]", "datetime"),
+    "session_name": ".//div[contains(@class, 'bw-session__name')]",
+    "level": ".//div[contains(@class, 'bw-session__level')]",
+    "instructor": ".//div[contains(@class, 'bw-session__staff')]",
+    "location": ".//div[contains(@class, 'bw-session__location')]",
+}
+WIDGET_MARKUP_URL = (
+    "https://widgets.mindbodyonline.com/widgets/schedules/{widget_id}/load_markup"
+)
+# requests the widget script makes for its schedule, the id is captured
+WIDGET_REQUEST_PATTERN = (
+    r"widgets\.(?:mindbodyonline|healcode)\.com/widgets/schedules/([\w-]+)"
+)
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
+)
+
+
+def fetch_html(url: str, timeout: int = 15) -> str:
+    request = Request(url, headers={"User-Agent": USER_AGENT})
+    with urlopen(request, timeout=timeout) as response:
+        charset = response.headers.get_content_charset() or "utf-8"
+        return response.read().decode(charset, errors="replace")
+
+
+def find_widget_id(html: str) -> Optional[str]:
+    """
+    return the schedule widget id declared by a `<healcode-widget>` tag, if any
+    """
+    match = re.search(
+        r"<healcode-widget[^>]*data-widget-id=[\"']([\w-]+)[\"']", html, re.IGNORECASE
+    )
+    return match.group(1) if match else None
+
+
+def find_iframe_urls(html: str, base_url: str) -> List[str]:
+    document = lxml.html.fromstring(html)
+    return [urljoin(base_url, src) for src in document.xpath("//iframe/@src") if src]
+
+
+def fetch_widget_markup(widget_id: str, start_date: Optional[date] = None) -> str:
+    """
+    fetch the rendered schedule markup the widget script would inject into the page.
+    The endpoint answers with JSON (or JSONP) wrapping the HTML.
+    """
+    params = {}
+    if start_date is not None:
+        params["options[start_date]"] = start_date.isoformat()
+    url = WIDGET_MARKUP_URL.format(widget_id=widget_id)
+    if params:
+        url += "?" + urlencode(params)
+    return unwrap_widget_payload(fetch_html(url))
+
+
+def unwrap_widget_payload(body: str) -> str:
+    """
+    return the schedule HTML carried by a widget response, which is JSON (or JSONP)
+    wrapping the markup. Bodies that are not JSON are returned as they are.
+    """
+    body = body.strip()
+    # strip a JSONP wrapper such as `callback({...});`
+    jsonp = re.match(r"^[\w$.]+\((.*)\);?$", body, re.DOTALL)
+    if jsonp:
+        body = jsonp.group(1)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(payload, dict):
+        return ""
+    for key in ("class_sessions", "contents", "html"):
+        if isinstance(payload.get(key), str):
+            return payload[key]
+    return ""
+
+
+def build_session(row: Dict[str, Optional[str]], url: str) -> Session:
+    """
+    turn a row of raw `SESSION_FIELDS` values into a session. Raises if the name or
+    either time is missing, empty optional text fields are left unset.
+    """
+    if not row.get("start_time") or not row.get("end_time"):
+        raise ValueError(f"session is missing its start or end time: {row}")
+    if not row.get("session_name"):
+        raise ValueError(f"session is missing its name: {row}")
+    return Session(
+        start_time=datetime.fromisoformat(row["start_time"]).replace(
+            tzinfo=edt_timezone
+        ),
+        end_time=datetime.fromisoformat(row["end_time"]).replace(tzinfo=edt_timezone),
+        session_name=row["session_name"],
+        instructor=row.get("instructor") or None,
+        level=row.get("level") or None,
+        location=row.get("location") or None,
+        url=url,
+    )
+
+
+def extract_rows(
+    html: str, container_xpath: str, fields: Dict[str, FieldSelector]
+) -> List[Dict[str, Optional[str]]]:
+    """
+    lxml counterpart of `BaseStudioHandler.extract_all` for raw HTML
+    """
+    if not html.strip():
+        return []
+    document = lxml.html.fromstring(html)
+    rows = []
+    for container in document.xpath(container_xpath):
+        row = {}
+        for name, selector in fields.items():
+            xpath, attribute = (
+                (selector, None) if isinstance(selector, str) else selector
+            )
+            element = container.xpath(xpath)
+            if not element:
+                row[name] = None
+            elif attribute:
+                row[name] = element[0].get(attribute)
+            else:
+                row[name] = " ".join(element[0].text_content().split())
+        rows.append(row)
+    return rows
+
+
+def parse_widget_sessions(html: str, url: str) -> List[Session]:
+    """
+    extract every `bw-session` from raw widget markup, skipping incomplete ones
+    """
+    sessions = []
+    for row in extract_rows(html, SESSION_XPATH, SESSION_FIELDS):
+        try:
+            sessions.append(build_session(row, url))
+        except ValueError:
+            continue
+    return sessions
+
+
+def unique_sessions(sessions: Iterable[Session]) -> List[Session]:
+    """
+    drop repeated sessions (same start time and name), e.g. a day listed both in
+    the page and in a later week's markup
+    """
+    seen = set()
+    unique = []
+    for session in sessions:
+        key = (session.start_time, session.session_name)
+        if key not in seen:
+            seen.add(key)
+            unique.append(session)
+    return unique
+
+
+def parse_widget_file(path: str, url: str) -> List[Session]:
+    with open(path, encoding="utf-8") as f:
+        return parse_widget_sessions(f.read(), url)
+
+
+class HealcodeStudioHandler(BaseStudioHandler):
+    """
+    base class for bw-widget studios. `crawl_static` is tried first and the
+    subclass' Selenium `iter_sessions` is only needed when it finds nothing. Within
+    `iter_sessions`, `captured_sessions` reads the widget's own responses before
+    falling back to clicking through the rendered calendar.
+    """
+
+    # pin the widget id to skip discovery from the studio page
+    widget_id: Optional[str] = None
+    # number of consecutive weeks requested from the widget endpoint, unless a
+    # horizon is set
+    static_weeks: int = 1
+
+    def weeks(self) -> int:
+        """
+        weeks of markup requested from the widget endpoint, which takes the start
+        date directly so later weeks need no calendar navigation
+        """
+        if self.horizon_days is None:
+            return self.static_weeks
+        return max(1, -(-self.horizon_days // 7))
+
+    def crawl_static(self, source: Optional[str] = None) -> bool:
+        try:
+            with metrics.span("static_crawl", studio=self.studio):
+                if source is not None:
+                    sessions = parse_widget_file(source, self.url)
+                else:
+                    sessions = self._fetch_static_sessions()
+        except Exception as e:
+            print(f"static crawl failed for {self.url}: {e}")
+            return False
+        if not sessions:
+            print(f"no sessions found without a browser for {self.url}")
+            return False
+
+        sessions = [s for s in unique_sessions(sessions) if self.within_horizon(s)]
+        self.data.extend(sessions)
+        print(f"parsed {len(sessions)} sessions without a browser for {self.url}")
+        return True
+
+    def captured_sessions(self) -> List[Session]:
+        # give the widget time to issue and finish its schedule requests
+        self.wait_for_dom_quiet(quiet_ms=500)
+        sessions = []
+        widget_id = None
+        for url, body in self.captured_responses(WIDGET_REQUEST_PATTERN):
+            widget_id = re.search(WIDGET_REQUEST_PATTERN, url).group(1)
+            sessions.extend(
+                parse_widget_sessions(unwrap_widget_payload(body), self.url)
+            )
+        if not sessions:
+            return []
+
+        # later weeks come straight from the endpoint instead of calendar clicks
+        today = datetime.now(edt_timezone).date()
+        for week in range(1, self.weeks()):
+            start = today + timedelta(weeks=week)
+            try:
+                markup = fetch_widget_markup(widget_id, start)
+                sessions.extend(parse_widget_sessions(markup, self.url))
+            except Exception as e:
+                print(f"error fetching week {week} for {self.url}: {e}")
+                self.failed_dates.update(start + timedelta(days=d) for d in range(7))
+        sessions = sorted(unique_sessions(sessions), key=lambda s: s.start_time)
+        print(
+            f"parsed {len(sessions)} sessions from captured widget responses for {self.url}"
+        )
+        return sessions
+
+    def read_sessions(self, plan: ExtractionPlan) -> List[Session]:
+        """
+        read every session matched by `plan` from the rendered page in one script
+        call
+        """
+        rows = self.extract(plan)
+        url = self.driver.current_url
+        sessions = []
+        for row in rows:
+            try:
+                sessions.append(build_session(row, url))
+            except Exception as e:
+                print(f"Error processing session: {e}")
+                self.partial = True
+        return sessions
+
+    def _fetch_static_sessions(self) -> List[Session]:
+        page = fetch_html(self.url)
+        sessions = parse_widget_sessions(page, self.url)
+        # the page itself holds the first week, later ones come from the endpoint
+        first_week = 1 if sessions else 0
+        if first_week >= self.weeks():
+            return sessions
+
+        widget_id = self.widget_id or find_widget_id(page)
+        if widget_id is None:
+            # the widget is commonly embedded one iframe deep (e.g. Wix html embeds)
+            for iframe_url in find_iframe_urls(page, self.url):
+                widget_id = find_widget_id(fetch_html(iframe_url))
+                if widget_id is not None:
+                    break
+        if widget_id is None:
+            return sessions
+
+        today = datetime.now(edt_timezone).date()
+        for week in range(first_week, self.weeks()):
+            markup = fetch_widget_markup(widget_id, today + timedelta(weeks=week))
+            sessions.extend(parse_widget_sessions(markup, self.url))
+        return sessions
@@ -1,7 +1,8 @@
-from studios.base_studio_handler import BaseStudioHandler
-from zoneinfo import ZoneInfo
-from selenium.webdriver.common.by import By
-from datetime import datetime, timedelta
+from studios.base_studio_handler import BaseStudioHandler, ExtractionPlan
+from studios.session import Session, edt_timezone
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional
+import json
 import re
 
 
@@ -12,74 +13,218 @@ none
 
 - class listing structure:
 calendar is displayed for the current week, viewing next week's schedule requries click a right nav button
+
+- network:
+the SutraPro page loads its schedule as JSON from its own api; when those responses
+are captured the sessions are read from them and no day needs to be clicked. The
+payload's field names are not pinned to a recorded response yet, so only lists made
+entirely of complete class entries are taken as a schedule; anything else falls
+back to the calendar
 """
 
+# JSON responses of the SutraPro app itself
+API_RESPONSE_PATTERN = r"sutrapro\.com/.*api"
+
+# candidate keys for each session field in the schedule payloads
+NAME_KEYS = ("name", "title", "className", "class_name")
+START_KEYS = ("startTime", "start_time", "startDate", "start", "startsAt")
+END_KEYS = ("endTime", "end_time", "endDate", "end", "endsAt")
+DURATION_KEYS = ("duration", "durationMinutes", "duration_minutes")
+INSTRUCTOR_KEYS = ("instructor", "teacher", "instructorName", "teacherName", "staff")
+LOCATION_KEYS = ("location", "room", "locationName")
+# longest class taken for real, longer spans are e.g. memberships or events
+MAX_SESSION_HOURS = 6
+
+
+def _first(item: dict, keys) -> Optional[object]:
+    for key in keys:
+        if item.get(key) not in (None, ""):
+            return item[key]
+    return None
+
+
+def _text(value) -> Optional[str]:
+    # nested objects such as {"name": ...} or {"firstName", "lastName"}
+    if isinstance(value, dict):
+        full_name = " ".join(
+            str(value[key]) for key in ("firstName", "lastName") if value.get(key)
+        )
+        value = value.get("name") or value.get("title") or full_name
+    if isinstance(value, list):
+        value = ", ".join(filter(None, (_text(v) for v in value)))
+    return str(value).strip() if value else None
+
+
+def _time(value) -> Optional[datetime]:
+    # a full timestamp, a bare date says nothing about a class
+    if not isinstance(value, str) or len(value) <= len("YYYY-MM-DD"):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=edt_timezone)
+    return parsed.astimezone(edt_timezone)
+
+
+def _lists(payload) -> Iterator[list]:
+    if isinstance(payload, dict):
+        for value in payload.values():
+            yield from _lists(value)
+    elif isinstance(payload, list):
+        yield payload
+        for value in payload:
+            yield from _lists(value)
+
+
+def _session(item, url: str) -> Optional[Session]:
+    """
+    the session an api entry describes, None unless it has a name, a start time
+    and an end time (or duration) making up a plausible class
+    """
+    if not isinstance(item, dict):
+        return None
+    name = _text(_first(item, NAME_KEYS))
+    start_time = _time(_first(item, START_KEYS))
+    if not name or start_time is None:
+        return None
+    end_time = _time(_first(item, END_KEYS))
+    if end_time is None:
+        duration = _first(item, DURATION_KEYS)
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)):
+            return None
+        end_time = start_time + timedelta(minutes=duration)
+    if not start_time < end_time <= start_time + timedelta(hours=MAX_SESSION_HOURS):
+        return None
+    return Session(
+        start_time=start_time,
+        end_time=end_time,
+        session_name=name,
+        instructor=_text(_first(item, INSTRUCTOR_KEYS)),
+        location=_text(_first(item, LOCATION_KEYS)),
+        url=url,
+    )
+
+
+def parse_api_sessions(payload, url: str) -> List[Session]:
+    """
+    read the sessions of every list in a payload whose entries all describe a
+    class. Lone objects and lists mixing in anything else are not a schedule and
+    are skipped, so unrelated api data is never stored as classes.
+    """
+    sessions = []
+    for entries in _lists(payload):
+        parsed = [_session(entry, url) for entry in entries]
+        if parsed and all(parsed):
+            sessions.extend(parsed)
+    return sessions
+
+
+def resolve_day(label: str, today: date, offset: int) -> date:
+    """
+    date of a calendar day labelled with its day of the month (e.g. "Mon 21"):
+    the first date from today on with that day. Labels without one fall back to
+    the `offset`-th day from today.
+    """
+    match = re.search(r"\b([12]?\d|3[01])\b", label or "")
+    if match:
+        day = int(match.group(1))
+        for delta in range(62):
+            candidate = today + timedelta(days=delta)
+            if candidate.day == day:
+                return candidate
+    return today + timedelta(days=offset)
+
+
+SESSION_XPATH = "//div[contains(concat(' ', normalize-space(@class), ' '), ' p-1 ') and contains(concat(' ', normalize-space(@class), ' '), ' card-body ')]"
+SESSION_FIELDS = {
+    "class_time": ".//p[contains(@class, 'dateTimeText') and contains(@class, 'card-text')]",
+    "session_name": ".//div[contains(@class, 'card-title')]",
+    "instructor": "(.//p[contains(@class, 'card-text')])[2]",
+    "location": "(.//p[contains(@class, 'card-text')])[3]",
+}
+SESSION_PLAN = ExtractionPlan.compile(SESSION_XPATH, SESSION_FIELDS)
+# the arrow moving the calendar to the following week
+NEXT_WEEK_XPATH = "//*[contains(@class, 'week-range')]//*[self::button or self::a][contains(@class, 'right') or contains(@class, 'next')]"
+DAY_XPATH = "//*[contains(@class, 'd-flex') and contains(@class, 'flex-column') and contains(@class, 'week-range__day') and not(contains(@class, 'week-range--disabled'))]"
+
 
 class ModegaCrawler(BaseStudioHandler):
     def __init__(self, driver, url):
         super().__init__(driver, url)
 
-    def crawl(self):
+    def captured_sessions(self) -> List[Session]:
+        self.wait_for_dom_quiet(quiet_ms=500)
+        sessions = {}
+        for _, body in self.captured_responses(API_RESPONSE_PATTERN):
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                continue
+            for session in parse_api_sessions(payload, self.url):
+                sessions[(session.start_time, session.session_name)] = session
+        if not sessions:
+            return []
+        print(
+            f"parsed {len(sessions)} sessions from captured api responses for {self.url}"
+        )
+        return sorted(sessions.values(), key=lambda s: s.start_time)
+
+    def iter_sessions(self) -> Iterator[Session]:
         self.visit_url()
+        captured = self.captured_sessions()
+        if captured:
+            yield from captured
+            return
 
-        dates = self.wait_for_all_visible(
-            "//*[contains(@class, 'd-flex') and contains(@class, 'flex-column') and contains(@class, 'week-range__day') and not(contains(@class, 'week-range--disabled'))]"
-        )
-        available_dates = len(dates)
+        # the week's days, loaded `day_tabs` at a time, then the following weeks
+        # until the horizon is covered
+        for sessions in self.iter_days(
+            lambda: self.wait_for_all_visible(DAY_XPATH),
+            self._read_day,
+            tabs=self.day_tabs,
+            limit=self.horizon_days,
+            next_page=(
+                (lambda: self.click_next_page(NEXT_WEEK_XPATH))
+                if self.horizon_days is not None
+                else None
+            ),
+        ):
+            yield from sessions
 
-        for i in range(available_dates):
-            self.driver.implicitly_wait(10)
-            try:
-                dates[i].click()
-            except:
-                dates = self.wait_for_all_visible(
-                    "//*[contains(@class, 'd-flex') and contains(@class, 'flex-column') and contains(@class, 'week-range__day') and not(contains(@class, 'week-range--disabled'))]"
+    def _read_day(self, i: int, label: str) -> List[Session]:
+        day = []
+        rows = self.extract(SESSION_PLAN)
+        url = self.driver.current_url
+        day_date = resolve_day(label, datetime.now(edt_timezone).date(), i)
+        try:
+            for row in rows:
+                class_time = row["class_time"]
+                start_time_str = re.search(r"(\d+:\d+\s(?:AM|PM))", class_time).group(1)
+                start_time = datetime.strptime(start_time_str, "%I:%M %p")
+                start_time = datetime.combine(
+                    day_date, start_time.time(), tzinfo=edt_timezone
                 )
-                dates[i].click()
+                match = re.search(r"\((\d+) min\)", class_time)
+                if match:
+                    duration = int(match.group(1))
+                else:
+                    duration = 0
+                end_time = start_time + timedelta(minutes=duration)
 
-            try:
-                classes = self.wait_for_all_visible(
-                    "//div[contains(concat(' ', normalize-space(@class), ' '), ' p-1 ') and contains(concat(' ', normalize-space(@class), ' '), ' card-body ')]"
-                )
-                for session in classes:
-                    class_time = session.find_element(
-                        By.XPATH,
-                        ".//p[contains(@class, 'dateTimeText') and contains(@class, 'card-text')]",
-                    ).text
-                    start_time_str = re.search(
-                        r"(\d+:\d+\s(?:AM|PM))", class_time
-                    ).group(1)
-                    start_time = datetime.strptime(start_time_str, "%I:%M %p")
-                    today = datetime.now().date()
-                    start_time = datetime.combine(
-                        today, start_time.timetz()
-                    ) + timedelta(days=i)
-                    start_time = start_time.replace(tzinfo=ZoneInfo("America/New_York"))
-                    match = re.search(r"\((\d+) min\)", class_time)
-                    if match:
-                        duration = int(match.group(1))
-                    else:
-                        duration = 0
-                    end_time = start_time + timedelta(minutes=duration)
-
-                    session_name = session.find_element(
-                        By.XPATH, ".//div[contains(@class, 'card-title')]"
-                    ).text
-                    misc_info = session.find_elements(
-                        By.XPATH, ".//p[contains(@class, 'card-text')]"
+                day.append(
+                    Session(
+                        start_time=start_time,
+                        end_time=end_time,
+                        session_name=row["session_name"],
+                        instructor=row["instructor"],
+                        location=row["location"],
+                        url=url,
                     )
-                    instructor = misc_info[1].text
-                    location = misc_info[2].text
-                    url = self.driver.current_url
-
-                    info = {
-                        "start_time": start_time,
-                        "end_time": end_time,
-                        "session_name": session_name,
-                        "instructor": instructor,
-                        "location": location,
-                        "url": url,
-                    }
-                    self.data.append(info)
-            except Exception as e:
-                print(f"errored parsing day {i}: {e}")
+                )
+        except Exception as e:
+            print(f"errored parsing day {i}: {e}")
+            self.failed_dates.add(day_date)
+        # keep the sessions parsed before a malformed one
+        return day
@@ -0,0 +1,98 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+import sys
+
+"""
+Typed session records shared by the crawlers, Firestore storage, the dev output and
+the weekly email.
+
+`Session` is a slotted record for a single class and `SessionBatch` a studio's list
+of them. Repeated strings (instructor, level, location, studio) are interned once,
+when a session is created, so that hundreds of sessions share a handful of string
+objects.
+"""
+
+# fields that repeat heavily across a studio's schedule
+INTERNED_FIELDS = ("level", "instructor", "location")
+
+# every studio is in New York, schedules are read and shown in its time
+edt_timezone = ZoneInfo("America/New_York")
+
+
+def local_time(moment: datetime) -> datetime:
+    """
+    `moment` in New York time. Sessions read back from Firestore carry UTC times,
+    so dates, weekdays and times shown to users are taken from this instead.
+    """
+    return moment.astimezone(edt_timezone)
+
+
+@dataclass(slots=True)
+class Session:
+    start_time: datetime
+    end_time: datetime
+    session_name: str
+    instructor: Optional[str] = None
+    level: Optional[str] = None
+    location: Optional[str] = None
+    url: Optional[str] = None
+
+    def __post_init__(self):
+        for name in INTERNED_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, sys.intern(value))
+
+    def to_dict(self) -> Dict:
+        """
+        document representation stored in Firestore, unset optional fields are
+        left out
+        """
+        return {
+            name: getattr(self, name)
+            for name in SESSION_FIELDS
+            if getattr(self, name) is not None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Session":
+        return cls(**{name: data.get(name) for name in SESSION_FIELDS})
+
+
+SESSION_FIELDS = tuple(f.name for f in fields(Session))
+
+
+class SessionBatch:
+    """
+    one studio's sessions, in the order they were added
+    """
+
+    def __init__(self, studio: Optional[str] = None, sessions: Iterable[Session] = ()):
+        self.studio = sys.intern(studio) if studio is not None else None
+        self.sessions: List[Session] = list(sessions)
+
+    def append(self, session: Session) -> None:
+        self.sessions.append(session)
+
+    def extend(self, sessions: Iterable[Session]) -> None:
+        self.sessions.extend(sessions)
+
+    def column(self, name: str) -> List:
+        """
+        the value of field `name` of every session
+        """
+        return [getattr(session, name) for session in self.sessions]
+
+    def to_records(self) -> List[Dict]:
+        return [session.to_dict() for session in self.sessions]
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __getitem__(self, index: int) -> Session:
+        return self.sessions[index]
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(self.sessions)
@@ -0,0 +1,227 @@
+from studios.base_studio_handler import BaseStudioHandler, ExtractionPlan, FieldSelector
+from studios.healcode import SESSION_FIELDS, HealcodeStudioHandler
+from studios.modega import ModegaCrawler
+from studios.session import Session
+from dataclasses import dataclass, fields
+from datetime import date
+from typing import Dict, Iterator, Optional, Type
+import json
+import os
+
+"""
+Declarative studio crawlers. Every studio in `site_data.json` declares its url, the
+schedule widget it embeds and, for the browser fallback, how to reach the
+schedule: a popup to close, an iframe to enter, the navigation mode and the
+selectors to read. Each spec is compiled once into a crawler class, so adding a
+studio using a supported widget only takes a new entry.
+
+Widgets:
+- "healcode": the Healcode / MindBody bw-widget, see `studios/healcode.py`
+- "sutrapro": the SutraPro booking page, see `studios/modega.py`
+
+Navigation modes of the healcode widget:
+- "single_page": every day is rendered at once and read in one pass
+- "calendar_days": each day of a calendar is clicked and read in turn
+"""
+
+SITE_DATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "site_data.json"
+)
+NAVIGATION_MODES = ("single_page", "calendar_days")
+
+
+@dataclass(frozen=True)
+class PopupSpec:
+    close_xpath: str
+    # the popup is not waited for once this shows up first, so it must not render
+    # before the popup would (e.g. an iframe present from the start)
+    content_xpath: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class StudioSpec:
+    name: str
+    url: str
+    widget: str
+    notes: str = ""
+    navigation: str = "single_page"
+    # elements shown once the schedule rendered, the days to click in calendar_days
+    ready_xpath: Optional[str] = None
+    container_xpath: Optional[str] = None
+    # defaults to the widget's own fields
+    fields: Optional[Dict[str, FieldSelector]] = None
+    popup: Optional[PopupSpec] = None
+    iframe_xpath: Optional[str] = None
+    # control moving the schedule to its next week or month, for longer horizons.
+    # Without one, a crawl that ends before the horizon is not taken as complete
+    next_xpath: Optional[str] = None
+    static_weeks: int = 1
+    widget_id: Optional[str] = None
+    # tabs loading days concurrently, for crawlers clicking through days
+    tabs: int = 1
+
+    @property
+    def clicks_days(self) -> bool:
+        """
+        whether the browser fallback clicks through the days of a calendar, each
+        click loading that day's classes from the widget's api
+        """
+        return self.widget == "sutrapro" or self.navigation == "calendar_days"
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict) -> "StudioSpec":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"unknown keys in the spec of {name}: {sorted(unknown)}")
+        data = dict(data)
+        if data.get("popup") is not None:
+            data["popup"] = PopupSpec(**data["popup"])
+        if data.get("fields") is not None:
+            # JSON has no tuples, (xpath, attribute) pairs come in as lists
+            data["fields"] = {
+                field: selector if isinstance(selector, str) else tuple(selector)
+                for field, selector in data["fields"].items()
+            }
+        spec = cls(name=name, **data)
+        spec.validate()
+        return spec
+
+    def validate(self) -> None:
+        if self.tabs < 1:
+            raise ValueError(f"{self.name}: tabs must be at least 1, got {self.tabs}")
+        if self.widget not in WIDGETS:
+            raise ValueError(
+                f"{self.name}: unsupported widget {self.widget!r}, expected one of {sorted(WIDGETS)}"
+            )
+        if self.widget != "healcode":
+            return
+        if self.navigation not in NAVIGATION_MODES:
+            raise ValueError(
+                f"{self.name}: unknown navigation {self.navigation!r}, expected one of {NAVIGATION_MODES}"
+            )
+        if not self.ready_xpath or not self.container_xpath:
+            raise ValueError(
+                f"{self.name}: ready_xpath and container_xpath are required"
+            )
+
+
+class HealcodeSpecCrawler(HealcodeStudioHandler):
+    """
+    browser fallback for a healcode studio, driven by its spec
+    """
+
+    spec: StudioSpec
+    plan: ExtractionPlan
+
+    def iter_sessions(self) -> Iterator[Session]:
+        self.visit_url()
+        captured = self.captured_sessions()
+        if captured:
+            yield from captured
+            return
+
+        self.open_schedule()
+        try:
+            days = self.wait_for_all_visible(self.spec.ready_xpath)
+        except Exception:
+            print(f"{self.studio} schedule not available, retrying")
+            self.open_schedule()
+            days = self.wait_for_all_visible(self.spec.ready_xpath)
+
+        if self.spec.navigation == "single_page":
+            self.wait_for_presence(self.plan.container_xpath)
+            yield from self.read_pages()
+            return
+
+        for sessions in self.iter_days(
+            lambda: self.wait_for_all_visible(self.spec.ready_xpath),
+            lambda i, label: self.read_sessions(self.plan),
+            tabs=self.day_tabs,
+            prepare=self.open_schedule,
+            focus=self.enter_iframe,
+            limit=self.horizon_days,
+            next_page=(
+                self.next_page
+                if self.spec.next_xpath and self.horizon_days is not None
+                else None
+            ),
+        ):
+            yield from sessions
+
+    def read_pages(self) -> Iterator[Session]:
+        """
+        read the rendered schedule, moving on to its next page while the horizon
+        reaches past the last session shown. Paging stops once a page shows no
+        later sessions than the one before, e.g. when the control did not move it.
+        """
+        last: Optional[date] = None
+        while True:
+            sessions = self.read_sessions(self.plan)
+            yield from sessions
+            if not self.spec.next_xpath or self.horizon_days is None or not sessions:
+                return
+            page_last = max(s.start_time.date() for s in sessions)
+            if last is not None and page_last <= last:
+                print(f"{self.studio} did not move past {last}, stopping")
+                return
+            last = page_last
+            if self.reaches_horizon(last):
+                return
+            try:
+                self.next_page()
+            except Exception as e:
+                print(f"could not move {self.studio} to its next page: {e}")
+                return
+
+    def next_page(self) -> None:
+        self.click_next_page(self.spec.next_xpath)
+
+    def open_schedule(self) -> None:
+        """
+        close the spec's popup, if any, and enter the schedule iframe, if any
+        """
+        if self.spec.iframe_xpath:
+            self.driver.switch_to.default_content()
+        if self.spec.popup:
+            self.close_popups(
+                self.spec.popup.close_xpath, content_xpath=self.spec.popup.content_xpath
+            )
+        self.enter_iframe()
+
+    def enter_iframe(self) -> None:
+        if self.spec.iframe_xpath:
+            iframe = self.wait_for_presence(self.spec.iframe_xpath)
+            self.driver.switch_to.frame(iframe)
+
+
+WIDGETS: Dict[str, Type[BaseStudioHandler]] = {
+    "healcode": HealcodeSpecCrawler,
+    "sutrapro": ModegaCrawler,
+}
+
+
+def crawler_class(spec: StudioSpec) -> Type[BaseStudioHandler]:
+    """
+    compile a spec into a crawler class, constructed like any other crawler with
+    (driver, url)
+    """
+    attributes = {"spec": spec, "day_tabs": spec.tabs}
+    if spec.widget == "healcode":
+        attributes.update(
+            plan=ExtractionPlan.compile(
+                spec.container_xpath, spec.fields or SESSION_FIELDS
+            ),
+            static_weeks=spec.static_weeks,
+            widget_id=spec.widget_id,
+        )
+    return type(f"{spec.name}Crawler", (WIDGETS[spec.widget],), attributes)
+
+
+def load_studio_specs(path: str = SITE_DATA_PATH) -> Dict[str, StudioSpec]:
+    with open(path) as f:
+        config = json.load(f)
+    return {
+        name: StudioSpec.from_dict(name, data)
+        for name, data in config["studios"].items()
+    }
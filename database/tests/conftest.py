@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import os
+import sys
+
+import pytest
+
+# modules import each other from the database directory, e.g. `from firestore...`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from studios.session import Session  # noqa: E402
+from tests.fake_firestore import FakeFirestore  # noqa: E402
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+@pytest.fixture
+def db() -> FakeFirestore:
+    return FakeFirestore()
+
+
+def make_session(
+    day: str, hour: int = 10, name: str = "Jazz", minutes: int = 60, **fields
+) -> Session:
+    start_time = datetime.fromisoformat(day).replace(hour=hour, tzinfo=NEW_YORK)
+    return Session(
+        start_time=start_time,
+        end_time=start_time + timedelta(minutes=minutes),
+        session_name=name,
+        **fields,
+    )
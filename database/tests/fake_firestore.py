@@ -0,0 +1,148 @@
+from typing import Dict, List, Optional, Tuple
+import operator
+
+"""
+In-memory stand-in for the parts of the Firestore client the crawler uses:
+collections and documents by path, `where` / `order_by` queries, `collections()`,
+`list_documents()` and write batches. Documents are kept in `FakeFirestore.store`
+keyed by their path, e.g. ("classes", "BDC", "2024-07-01", "id").
+"""
+
+Path = Tuple[str, ...]
+
+OPERATORS = {
+    "==": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, values: value in values,
+}
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocument", data: Optional[dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[dict]:
+        return None if self._data is None else dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, db: "FakeFirestore", path: Path):
+        self.db = db
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self.db, self.path + (name,))
+
+    def get(self) -> FakeSnapshot:
+        return FakeSnapshot(self, self.db.store.get(self.path))
+
+    def set(self, data: dict) -> None:
+        self.db.store[self.path] = dict(data)
+
+    def delete(self) -> None:
+        self.db.store.pop(self.path, None)
+
+    def collections(self) -> List["FakeCollection"]:
+        depth = len(self.path)
+        names = {
+            path[depth]
+            for path in self.db.store
+            if len(path) > depth + 1 and path[:depth] == self.path
+        }
+        return [FakeCollection(self.db, self.path + (name,)) for name in sorted(names)]
+
+
+class FakeCollection:
+    def __init__(self, db: "FakeFirestore", path: Path, filters=(), order=None):
+        self.db = db
+        self.path = path
+        self.id = path[-1]
+        self.filters = filters
+        self.order = order
+
+    def document(self, id: str) -> FakeDocument:
+        return FakeDocument(self.db, self.path + (id,))
+
+    def where(self, field: str, op: str, value) -> "FakeCollection":
+        filters = self.filters + ((field, OPERATORS[op], value),)
+        return FakeCollection(self.db, self.path, filters, self.order)
+
+    def order_by(self, field: str) -> "FakeCollection":
+        return FakeCollection(self.db, self.path, self.filters, field)
+
+    def stream(self) -> List[FakeSnapshot]:
+        depth = len(self.path)
+        matches = [
+            FakeSnapshot(FakeDocument(self.db, path), data)
+            for path, data in sorted(self.db.store.items())
+            if len(path) == depth + 1
+            and path[:depth] == self.path
+            and all(
+                field in data and compare(data[field], value)
+                for field, compare, value in self.filters
+            )
+        ]
+        if self.order is not None:
+            matches.sort(key=lambda snapshot: snapshot.to_dict()[self.order])
+        return matches
+
+    def list_documents(self) -> List[FakeDocument]:
+        depth = len(self.path)
+        ids = {
+            path[depth]
+            for path in self.db.store
+            if len(path) > depth and path[:depth] == self.path
+        }
+        return [FakeDocument(self.db, self.path + (id,)) for id in sorted(ids)]
+
+
+class FakeBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self.db = db
+        self.operations = []
+
+    def set(self, reference: FakeDocument, data: dict) -> None:
+        self.operations.append((reference, data))
+
+    def delete(self, reference: FakeDocument) -> None:
+        self.operations.append((reference, None))
+
+    def commit(self) -> None:
+        self.db.commits.append(len(self.operations))
+        if self.db.failures:
+            self.db.failures -= 1
+            raise RuntimeError("commit failed")
+        for reference, data in self.operations:
+            if data is None:
+                reference.delete()
+            else:
+                reference.set(data)
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.store: Dict[Path, dict] = {}
+        # sizes of every attempted batch commit
+        self.commits: List[int] = []
+        # number of upcoming batch commits that fail
+        self.failures = 0
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, (name,))
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def documents(self, *prefix: str) -> Dict[Path, dict]:
+        return {
+            path: data
+            for path, data in self.store.items()
+            if path[: len(prefix)] == prefix
+        }
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from conftest import NEW_YORK, make_session
+from studios.base_studio_handler import BaseStudioHandler
+from studios.session import Session
+
+
+def upcoming(days: int):
+    today = datetime.now(NEW_YORK).date()
+    return [(today + timedelta(days=d)).isoformat() for d in range(days)]
+
+
+class ScheduleCrawler(BaseStudioHandler):
+    def __init__(self, days, horizon_days=None):
+        super().__init__(None, "u")
+        self.days = days
+        self.horizon_days = horizon_days
+
+    def iter_sessions(self) -> Iterator[Session]:
+        for day in self.days:
+            yield make_session(day)
+
+
+def test_sessions_past_the_horizon_are_dropped():
+    crawler = ScheduleCrawler(upcoming(10), horizon_days=7)
+
+    crawler.crawl()
+
+    assert len(crawler.data) == 7
+    assert crawler.complete
+
+
+def test_a_schedule_ending_before_the_horizon_is_not_complete():
+    crawler = ScheduleCrawler(upcoming(5), horizon_days=14)
+
+    crawler.crawl()
+
+    assert crawler.short
+    assert not crawler.complete
+
+
+def test_without_a_horizon_any_schedule_is_complete():
+    crawler = ScheduleCrawler(upcoming(2))
+
+    crawler.crawl()
+
+    assert crawler.complete
@@ -0,0 +1,54 @@
+import pytest
+
+from firestore.batch_writer import MAX_BATCH_SIZE, BatchWriter
+
+
+def test_commit_chunks_operations_into_batches(db):
+    writer = BatchWriter(db, batch_size=3)
+    for i in range(7):
+        writer.set(db.collection("classes").document(f"id{i}"), {"n": i}, "BDC")
+    writer.delete(db.collection("classes").document("id0"), "Peri")
+
+    results = writer.commit()
+
+    assert sorted(db.commits) == [2, 3, 3]
+    assert results["BDC"].written == 7
+    assert results["Peri"].written == 1
+    assert len(db.documents("classes")) == 6
+    # the queue is emptied by a commit
+    assert len(writer) == 0
+    assert writer.commit() == {}
+
+
+def test_failed_batches_are_retried(db):
+    db.failures = 2
+    writer = BatchWriter(db, max_retries=3, backoff=0)
+    writer.set(db.collection("classes").document("id"), {"n": 1}, "BDC")
+
+    results = writer.commit()
+
+    assert db.commits == [1, 1, 1]
+    assert results["BDC"].written == 1
+    assert results["BDC"].failed == 0
+    assert db.documents("classes") == {("classes", "id"): {"n": 1}}
+
+
+def test_batches_failing_every_retry_are_counted_failed(db):
+    db.failures = 10
+    writer = BatchWriter(db, batch_size=2, workers=1, max_retries=1, backoff=0)
+    for i in range(3):
+        writer.set(db.collection("classes").document(f"id{i}"), {"n": i}, "BDC")
+
+    results = writer.commit()
+
+    # two attempts for each of the two batches
+    assert len(db.commits) == 4
+    assert results["BDC"].written == 0
+    assert results["BDC"].failed == 3
+    assert db.documents("classes") == {}
+
+
+@pytest.mark.parametrize("batch_size", [0, MAX_BATCH_SIZE + 1])
+def test_batch_size_is_bounded(db, batch_size):
+    with pytest.raises(ValueError):
+        BatchWriter(db, batch_size=batch_size)
@@ -0,0 +1,65 @@
+import json
+
+from conftest import make_session
+from crawl_cache import CrawlCache
+from studios.session import SessionBatch
+
+URL = "https://studio.example"
+WINDOW = "2030-01-07"
+
+
+def batch():
+    return SessionBatch(
+        "BDC",
+        [
+            make_session("2030-01-07", name="Jazz", instructor="Ana"),
+            make_session("2030-01-08", name="Ballet", level="Beginner"),
+        ],
+    )
+
+
+def test_saved_sessions_are_loaded_back(tmp_path):
+    cache = CrawlCache(str(tmp_path))
+    cache.save("BDC", URL, WINDOW, batch())
+
+    loaded = cache.load("BDC", URL, WINDOW)
+
+    assert loaded.studio == "BDC"
+    assert list(loaded) == list(batch())
+
+
+def test_entries_of_another_url_or_window_are_misses(tmp_path):
+    cache = CrawlCache(str(tmp_path))
+    cache.save("BDC", URL, WINDOW, batch())
+
+    assert cache.load("BDC", "https://other.example", WINDOW) is None
+    assert cache.load("BDC", URL, "2030-01-08") is None
+    assert cache.load("BDC", URL, f"{WINDOW}+28d") is None
+    assert cache.load("Peri", URL, WINDOW) is None
+
+
+def test_entries_older_than_the_ttl_are_misses(tmp_path):
+    cache = CrawlCache(str(tmp_path), ttl_hours=1)
+    cache.save("BDC", URL, WINDOW, batch())
+    path = tmp_path / "BDC.json"
+    entry = json.loads(path.read_text())
+    entry["crawled_at"] -= 3601
+    path.write_text(json.dumps(entry))
+
+    assert cache.load("BDC", URL, WINDOW) is None
+
+
+def test_a_zero_ttl_disables_the_cache(tmp_path):
+    cache = CrawlCache(str(tmp_path / "cache"), ttl_hours=0)
+
+    cache.save("BDC", URL, WINDOW, batch())
+
+    assert not (tmp_path / "cache").exists()
+    assert cache.load("BDC", URL, WINDOW) is None
+
+
+def test_unreadable_entries_are_misses(tmp_path):
+    cache = CrawlCache(str(tmp_path))
+    (tmp_path / "BDC.json").write_text('{"key": "abc", "sessi')
+
+    assert cache.load("BDC", URL, WINDOW) is None
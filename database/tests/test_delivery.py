@@ -0,0 +1,133 @@
+from email.message import EmailMessage
+import json
+import smtplib
+import socket
+
+import pytest
+
+from emails.delivery import DeliveryLog, SmtpDelivery, is_transient
+from emails.local_smtp import start_local_smtp
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    port = free_port()
+    controller, handler = start_local_smtp("localhost", port)
+    yield port, handler
+    controller.stop()
+
+
+def messages(recipients):
+    for recipient in recipients:
+        message = EmailMessage()
+        message["From"] = "news@example.com"
+        message["To"] = recipient
+        message["Subject"] = "Weekly update"
+        message.set_content("classes")
+        yield recipient, message
+
+
+def delivery(port, log_path, **options):
+    return SmtpDelivery(
+        "localhost",
+        port,
+        "news@example.com",
+        use_ssl=False,
+        per_second=0,
+        backoff=0,
+        log_path=str(log_path),
+        **options,
+    )
+
+
+def test_every_message_is_delivered_and_logged(smtp_server, tmp_path):
+    port, handler = smtp_server
+    recipients = [f"user{i}@example.com" for i in range(7)]
+
+    report = delivery(port, tmp_path / "log.jsonl").send_all(messages(recipients))
+
+    assert (report.sent, report.skipped, report.failed) == (7, 0, 0)
+    assert handler.received == 7
+    assert sorted(handler.recipients) == sorted(recipients)
+    assert DeliveryLog(str(tmp_path / "log.jsonl")).delivered() == set(recipients)
+
+
+def test_rerun_resumes_after_the_logged_recipients(smtp_server, tmp_path):
+    port, handler = smtp_server
+    log_path = tmp_path / "log.jsonl"
+    recipients = [f"user{i}@example.com" for i in range(5)]
+    delivery(port, log_path).send_all(messages(recipients[:3]))
+    # a line cut short by an interrupted run is ignored
+    with open(log_path, "a") as f:
+        f.write('{"recipient": "user3@exa')
+
+    report = delivery(port, log_path).send_all(messages(recipients))
+
+    assert (report.sent, report.skipped) == (2, 3)
+    assert handler.received == 5
+    assert sorted(handler.recipients) == sorted(recipients)
+
+
+def test_permanent_failures_are_logged_without_retries(tmp_path):
+    attempts = []
+
+    class RefusingDelivery(SmtpDelivery):
+        def _connection(self):
+            attempts.append(1)
+            raise smtplib.SMTPRecipientsRefused({"user@example.com": (550, b"no")})
+
+    log_path = tmp_path / "log.jsonl"
+    report = RefusingDelivery(
+        "localhost", 0, "news@example.com", per_second=0, log_path=str(log_path)
+    ).send_all(messages(["user@example.com"]))
+
+    assert report.failed == 1
+    assert len(attempts) == 1
+    with open(log_path) as f:
+        assert json.loads(f.readline())["status"] == "failed"
+
+
+def test_rejected_login_stops_the_run(smtp_server, tmp_path):
+    port, handler = smtp_server
+    logins = []
+
+    class RejectedDelivery(SmtpDelivery):
+        def _connection(self):
+            logins.append(1)
+            raise smtplib.SMTPAuthenticationError(535, b"bad credentials")
+
+    log_path = tmp_path / "log.jsonl"
+    rejected = RejectedDelivery(
+        "localhost", port, "news@example.com", per_second=0, log_path=str(log_path)
+    )
+    recipients = [f"user{i}@example.com" for i in range(20)]
+
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        rejected.send_all(messages(recipients))
+
+    assert len(logins) == 1
+    assert handler.received == 0
+    # nobody is recorded as failed, a rerun with the right password sends to all
+    assert not log_path.exists()
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (smtplib.SMTPServerDisconnected(), True),
+        (smtplib.SMTPResponseException(421, b"try later"), True),
+        (ConnectionResetError(), True),
+        (smtplib.SMTPResponseException(550, b"no such user"), False),
+        (smtplib.SMTPRecipientsRefused({}), False),
+        (smtplib.SMTPNotSupportedError(), False),
+        (smtplib.SMTPAuthenticationError(535, b"bad credentials"), False),
+    ],
+)
+def test_is_transient(error, transient):
+    assert is_transient(error) is transient
@@ -0,0 +1,110 @@
+from datetime import date, timezone
+import csv
+import json
+import os
+
+import pytest
+
+from conftest import make_session
+from export import export_sessions, to_arrow_table, write_dataset
+from studios.session import SessionBatch
+
+CRAWLED_ON = date(2030, 1, 6)
+
+
+def batches():
+    late = make_session("2030-01-13", 21, "Late Jazz")
+    # as read back from Firestore: Monday 02:00 UTC, still Sunday of 2030-W02 in
+    # New York
+    late.start_time = late.start_time.astimezone(timezone.utc)
+    return [
+        SessionBatch(
+            "BDC",
+            [
+                make_session("2030-01-07", name="Jazz", instructor="Ana"),
+                late,
+                make_session("2030-01-14", name="Ballet"),
+            ],
+        ),
+        SessionBatch("Peri", [make_session("2030-01-08", name="Tap")]),
+    ]
+
+
+def partitions(root):
+    return sorted(
+        os.path.relpath(directory, root)
+        for directory, _, files in os.walk(root)
+        if files
+    )
+
+
+def test_datasets_are_partitioned_by_studio_and_week(tmp_path):
+    written = write_dataset(batches(), str(tmp_path), CRAWLED_ON)
+
+    assert written == 4
+    assert partitions(tmp_path) == [
+        os.path.join("studio=BDC", "week=2030-W02"),
+        os.path.join("studio=BDC", "week=2030-W03"),
+        os.path.join("studio=Peri", "week=2030-W02"),
+    ]
+    assert os.listdir(tmp_path / "studio=BDC" / "week=2030-W02") == [
+        "2030-01-06-0.parquet"
+    ]
+
+
+def test_later_crawls_add_files_next_to_earlier_ones(tmp_path):
+    import pyarrow.dataset as ds
+
+    write_dataset(batches(), str(tmp_path), CRAWLED_ON)
+    write_dataset(batches(), str(tmp_path), date(2030, 1, 7))
+
+    table = ds.dataset(str(tmp_path), format="parquet", partitioning="hive").to_table()
+
+    assert table.num_rows == 8
+    assert sorted(os.listdir(tmp_path / "studio=Peri" / "week=2030-W02")) == [
+        "2030-01-06-0.parquet",
+        "2030-01-07-0.parquet",
+    ]
+
+
+def test_arrow_tables_dictionary_encode_repeated_strings():
+    import pyarrow as pa
+
+    table = to_arrow_table(batches(), CRAWLED_ON)
+
+    assert table.num_rows == 4
+    assert pa.types.is_dictionary(table.schema.field("studio").type)
+    assert pa.types.is_timestamp(table.schema.field("start_time").type)
+    assert table.column("week").to_pylist() == [
+        "2030-W02",
+        "2030-W02",
+        "2030-W03",
+        "2030-W02",
+    ]
+
+
+def test_empty_crawls_write_no_dataset(tmp_path):
+    assert write_dataset([SessionBatch("BDC")], str(tmp_path / "out"), CRAWLED_ON) == 0
+    assert not (tmp_path / "out").exists()
+
+
+def test_flat_files_hold_one_row_per_session(tmp_path):
+    export_sessions(batches(), ["csv", "ndjson"], str(tmp_path), CRAWLED_ON)
+
+    with open(tmp_path / "sessions_2030-01-06.csv") as f:
+        rows = list(csv.DictReader(f))
+    with open(tmp_path / "sessions_2030-01-06.ndjson") as f:
+        records = [json.loads(line) for line in f]
+
+    assert rows == [
+        {key: "" if value is None else value for key, value in record.items()}
+        for record in records
+    ]
+    assert [row["studio"] for row in rows] == ["BDC", "BDC", "BDC", "Peri"]
+    assert rows[0]["instructor"] == "Ana"
+    assert rows[0]["crawled_on"] == "2030-01-06"
+
+
+def test_unknown_formats_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="unknown export format"):
+        export_sessions(batches(), ["xlsx"], str(tmp_path), CRAWLED_ON)
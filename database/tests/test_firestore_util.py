@@ -0,0 +1,13 @@
+from google.cloud import firestore
+
+from firestore.firestore_util import Firebase
+
+
+def test_emulator_client_needs_no_credentials(monkeypatch, tmp_path):
+    monkeypatch.setenv("FIRESTORE_EMULATOR_HOST", "localhost:8080")
+    # no default credentials to fall back on
+    monkeypatch.setenv("GOOGLE_APPLICATION_CREDENTIALS", str(tmp_path / "missing.json"))
+
+    db = Firebase().create_firebase_admin()
+
+    assert isinstance(db, firestore.Client)
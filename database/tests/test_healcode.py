@@ -0,0 +1,71 @@
+from datetime import datetime
+import json
+
+from conftest import NEW_YORK
+from studios.healcode import (
+    find_widget_id,
+    parse_widget_sessions,
+    unique_sessions,
+    unwrap_widget_payload,
+)
+
+SESSION = """
+<div class="bw-session">
+  <time class="hc_starttime" datetime="{start}">7:00 PM</time>
+  <time class="hc_endtime" datetime="{end}">8:30 PM</time>
+  <div class="bw-session__name">{name}</div>
+  <div class="bw-session__staff">  Ana   Lopez </div>
+  <div class="bw-session__level">Beginner</div>
+</div>
+"""
+
+MARKUP = f"""
+<div class="bw-widget__day">
+  {SESSION.format(start="2030-01-07T19:00", end="2030-01-07T20:30", name="Jazz Funk")}
+  {SESSION.format(start="2030-01-08T10:00", end="2030-01-08T11:00", name="Ballet")}
+  <div class="bw-session"><div class="bw-session__name">No times</div></div>
+</div>
+"""
+
+
+def test_sessions_are_parsed_in_new_york_time():
+    sessions = parse_widget_sessions(MARKUP, "https://studio.example")
+
+    assert [s.session_name for s in sessions] == ["Jazz Funk", "Ballet"]
+    jazz = sessions[0]
+    assert jazz.start_time == datetime(2030, 1, 7, 19, tzinfo=NEW_YORK)
+    assert jazz.end_time == datetime(2030, 1, 7, 20, 30, tzinfo=NEW_YORK)
+    assert jazz.instructor == "Ana Lopez"
+    assert jazz.level == "Beginner"
+    assert jazz.location is None
+    assert jazz.url == "https://studio.example"
+
+
+def test_empty_markup_has_no_sessions():
+    assert parse_widget_sessions("  ", "u") == []
+    assert parse_widget_sessions("<div>closed this week</div>", "u") == []
+
+
+def test_widget_payloads_are_unwrapped():
+    payload = json.dumps({"class_sessions": MARKUP})
+
+    assert unwrap_widget_payload(payload) == MARKUP
+    assert unwrap_widget_payload(f"callback({payload});") == MARKUP
+    assert unwrap_widget_payload(MARKUP) == MARKUP.strip()
+    assert unwrap_widget_payload("[1, 2]") == ""
+
+
+def test_widget_id_is_read_from_the_embed():
+    page = '<healcode-widget data-type="schedules" data-widget-id="8a1b2c3d4e"></healcode-widget>'
+
+    assert find_widget_id(page) == "8a1b2c3d4e"
+    assert find_widget_id("<div></div>") is None
+
+
+def test_repeated_sessions_are_dropped():
+    sessions = parse_widget_sessions(MARKUP + MARKUP, "u")
+
+    assert [s.session_name for s in unique_sessions(sessions)] == [
+        "Jazz Funk",
+        "Ballet",
+    ]
@@ -0,0 +1,168 @@
+from typing import Iterator
+
+import pytest
+
+from conftest import make_session
+from firestore.snapshot import read_upcoming_classes
+import main
+from main import StudioCrawler
+from studios.base_studio_handler import BaseStudioHandler
+from studios.session import Session
+
+DAYS = ["2030-01-07", "2030-01-08", "2030-01-09"]
+
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+
+class DayCrawler(BaseStudioHandler):
+    """
+    yields two classes on each of `days`, then fails when `fails` is set
+    """
+
+    days = DAYS
+    fails = False
+    crawls = 0
+
+    def iter_sessions(self) -> Iterator[Session]:
+        type(self).crawls += 1
+        for day in self.days:
+            yield make_session(day, name="Jazz")
+            yield make_session(day, hour=18, name="Tap")
+        if self.fails:
+            raise RuntimeError("schedule stopped loading")
+
+
+class FailingCrawler(DayCrawler):
+    fails = True
+
+
+def studio_crawler(db, monkeypatch, tmp_path, crawlers, **options):
+    class FakeFirebase:
+        def create_firebase_admin(self):
+            return db
+
+    monkeypatch.setattr(main, "Firebase", FakeFirebase)
+    crawler = StudioCrawler(
+        {
+            studio: {"crawler": cls, "url": f"https://{studio}"}
+            for studio, cls in crawlers.items()
+        },
+        "prod",
+        cache_dir=str(tmp_path / "cache"),
+        **options,
+    )
+    crawler.driver_pool.factory = FakeDriver
+    return crawler
+
+
+def stored_dates(db, studio):
+    return sorted({path[2] for path in db.documents("classes", studio)})
+
+
+@pytest.fixture(autouse=True)
+def reset_crawls():
+    DayCrawler.crawls = 0
+    FailingCrawler.crawls = 0
+
+
+def test_crawled_days_are_stored_per_studio(db, monkeypatch, tmp_path):
+    crawler = studio_crawler(
+        db, monkeypatch, tmp_path, {"A": DayCrawler, "B": DayCrawler}, workers=2
+    )
+
+    crawler.crawl_and_store()
+
+    for studio in ("A", "B"):
+        assert stored_dates(db, studio) == DAYS
+        assert len(db.documents("classes", studio)) == 6
+        assert ("sync_manifests", studio) in db.store
+    assert db.documents("schedules")
+    assert crawler.failures == {}
+
+
+def test_sessions_of_a_failed_crawl_are_all_stored(db, monkeypatch, tmp_path):
+    crawler = studio_crawler(db, monkeypatch, tmp_path, {"B": FailingCrawler})
+
+    with pytest.warns(UserWarning, match="schedule stopped loading"):
+        crawler.crawl_and_store()
+
+    assert "B" in crawler.failures
+    # the last day was read before the failure and is stored as well
+    assert stored_dates(db, "B") == DAYS
+    # a failed crawl republishes no snapshots and is not cached
+    assert db.documents("schedules") == {}
+    assert not (tmp_path / "cache" / "B.json").exists()
+
+
+def test_failed_crawls_delete_nothing(db, monkeypatch, tmp_path):
+    studio_crawler(db, monkeypatch, tmp_path, {"B": DayCrawler}).crawl_and_store()
+    stored = dict(db.documents("classes", "B"))
+    # the crawl breaks off after the first day
+    monkeypatch.setattr(DayCrawler, "days", DAYS[:1])
+    monkeypatch.setattr(DayCrawler, "fails", True)
+
+    crawler = studio_crawler(
+        db, monkeypatch, tmp_path, {"B": DayCrawler}, refresh=["B"]
+    )
+    with pytest.warns(UserWarning):
+        crawler.crawl_and_store()
+
+    assert db.documents("classes", "B") == stored
+
+
+def test_cached_studios_are_stored_without_crawling(db, monkeypatch, tmp_path):
+    studio_crawler(db, monkeypatch, tmp_path, {"B": DayCrawler}).crawl_and_store()
+    db.store.clear()
+
+    studio_crawler(db, monkeypatch, tmp_path, {"B": DayCrawler}).crawl_and_store()
+
+    assert DayCrawler.crawls == 1
+    assert stored_dates(db, "B") == DAYS
+
+
+def test_readers_see_updates_of_an_incomplete_crawl(db, monkeypatch, tmp_path):
+    studio_crawler(db, monkeypatch, tmp_path, {"B": DayCrawler}).crawl_and_store()
+    assert db.documents("schedules")
+
+    class UpdatedCrawler(DayCrawler):
+        def iter_sessions(self):
+            for day in DAYS:
+                yield make_session(day, name="Jazz", instructor="Ana")
+                yield make_session(day, hour=18, name="Tap")
+            raise RuntimeError("schedule stopped loading")
+
+    crawler = studio_crawler(
+        db, monkeypatch, tmp_path, {"B": UpdatedCrawler}, refresh=["B"]
+    )
+    with pytest.warns(UserWarning):
+        crawler.crawl_and_store()
+
+    # the outdated snapshots are gone, readers use the flat sessions instead
+    assert db.documents("schedules") == {}
+    upcoming = read_upcoming_classes(db, ["B"], DAYS[0])["B"]
+    assert len(upcoming) == 6
+    assert {s.instructor for s in upcoming if s.session_name == "Jazz"} == {"Ana"}
+
+
+def test_only_and_refresh_select_the_studios_crawled(db, monkeypatch, tmp_path):
+    studios = {"A": DayCrawler, "B": DayCrawler, "C": DayCrawler}
+    studio_crawler(db, monkeypatch, tmp_path, {"A": DayCrawler}).crawl_and_store()
+
+    crawler = studio_crawler(db, monkeypatch, tmp_path, studios, only=["B"])
+    pending = crawler._load_cached()
+
+    # A comes from the cache, C is neither cached nor selected
+    assert sorted(pending) == ["B"]
+    assert crawler.cached == {"A"}
+
+    crawler = studio_crawler(
+        db, monkeypatch, tmp_path, studios, only=["B"], refresh=["A"]
+    )
+    assert sorted(crawler._load_cached()) == ["A", "B"]
+    assert crawler.cached == set()
+
+    crawler = studio_crawler(db, monkeypatch, tmp_path, studios)
+    assert sorted(crawler._load_cached()) == ["B", "C"]
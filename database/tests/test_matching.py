@@ -0,0 +1,81 @@
+from datetime import timezone
+
+from conftest import make_session
+from emails.matching import SessionIndex
+from studios.session import SessionBatch
+
+
+def build_index(**options):
+    # 2030-01-07 is a Monday
+    return SessionIndex(
+        {
+            "BDC": SessionBatch(
+                "BDC",
+                [
+                    make_session("2030-01-07", 18, "Jazz Funk", instructor="Ana"),
+                    make_session("2030-01-08", 10, "Ballet", level="Beginner"),
+                ],
+            ),
+            "Peri": SessionBatch(
+                "Peri",
+                [
+                    make_session("2030-01-07", 9, "Contemporary", level="Advanced"),
+                    make_session("2030-01-09", 12, "Jazz", instructor=" ana "),
+                ],
+            ),
+        },
+        **options,
+    )
+
+
+def names(sessions):
+    return [session.session_name for session in sessions]
+
+
+def test_empty_preferences_match_everything_in_start_order():
+    index = build_index()
+
+    matched = index.match({"instructor": "", "studio": [], "dayOfWeek": []})
+
+    assert names(matched) == ["Contemporary", "Jazz Funk", "Ballet", "Jazz"]
+
+
+def test_every_preference_must_hold():
+    index = build_index()
+
+    assert names(index.match({"studio": ["BDC"], "dayOfWeek": ["Monday"]})) == [
+        "Jazz Funk"
+    ]
+    assert names(index.match({"studio": ["Peri", "BDC"], "style": "jazz"})) == [
+        "Jazz Funk",
+        "Jazz",
+    ]
+    assert names(index.match({"instructor": "ANA", "dayOfWeek": ["Wednesday"]})) == [
+        "Jazz"
+    ]
+    assert names(index.match({"level": "beginner"})) == ["Ballet"]
+    assert index.match({"style": "hip hop"}) == []
+
+
+def test_weekdays_are_taken_in_new_york_time():
+    late = make_session("2030-01-07", 21, "Late Jazz")
+    # as read back from Firestore: Tuesday 02:00 UTC
+    late.start_time = late.start_time.astimezone(timezone.utc)
+    index = SessionIndex({"BDC": SessionBatch("BDC", [late])})
+
+    assert names(index.match({"dayOfWeek": ["Monday"]})) == ["Late Jazz"]
+    assert index.match({"dayOfWeek": ["Tuesday"]}) == []
+
+
+def test_cache_keeps_the_most_recent_preferences_only():
+    index = build_index(cache_size=2)
+
+    first = index.match({"studio": ["BDC"]})
+    index.match({"studio": ["Peri"]})
+    assert index.match({"studio": ["BDC"]}) is first
+    index.match({"style": "jazz"})
+
+    assert len(index._cache) == 2
+    # the least recently used preferences were dropped
+    assert names(index.match({"studio": ["Peri"]})) == ["Contemporary", "Jazz"]
+    assert len(index._cache) == 2
@@ -0,0 +1,79 @@
+from datetime import date, datetime
+
+from conftest import NEW_YORK
+from studios.modega import parse_api_sessions, resolve_day
+
+
+def test_schedule_lists_are_read():
+    payload = {
+        "data": {
+            "classes": [
+                {
+                    "name": "Hip Hop",
+                    "startTime": "2030-01-08T00:00:00Z",
+                    "duration": 60,
+                    "instructor": {"firstName": "Ana", "lastName": "Lopez"},
+                    "room": "Studio A",
+                },
+                {
+                    "title": "Heels",
+                    "start_time": "2030-01-07T20:00:00-05:00",
+                    "end_time": "2030-01-07T21:30:00-05:00",
+                },
+            ]
+        }
+    }
+
+    sessions = parse_api_sessions(payload, "https://sutrapro.com/modega")
+
+    hip_hop, heels = sessions
+    # UTC times are converted to New York
+    assert hip_hop.start_time == datetime(2030, 1, 7, 19, tzinfo=NEW_YORK)
+    assert hip_hop.end_time == datetime(2030, 1, 7, 20, tzinfo=NEW_YORK)
+    assert hip_hop.instructor == "Ana Lopez"
+    assert hip_hop.location == "Studio A"
+    assert heels.session_name == "Heels"
+    assert heels.end_time == datetime(2030, 1, 7, 21, 30, tzinfo=NEW_YORK)
+
+
+def test_other_api_objects_are_not_taken_for_classes():
+    payload = {
+        # a lone object with a name and a timestamp
+        "studio": {"name": "Modega", "createdAt": "2020-01-01T00:00:00Z"},
+        "user": {"name": "Ana", "start": "2024-01-01T00:00:00Z", "duration": 30},
+        # spans far longer than a class
+        "memberships": [
+            {
+                "name": "Unlimited",
+                "start": "2030-01-01T00:00:00Z",
+                "end": "2030-02-01T00:00:00Z",
+            }
+        ],
+        # dates without a time of day
+        "events": [{"name": "Showcase", "startDate": "2030-01-10", "duration": 60}],
+        # one incomplete entry disqualifies the list
+        "mixed": [
+            {"name": "Jazz", "startTime": "2030-01-07T18:00:00Z", "duration": 60},
+            {"name": "Open studio"},
+        ],
+    }
+
+    assert parse_api_sessions(payload, "u") == []
+
+
+def test_day_labels_resolve_to_the_next_date_with_that_day():
+    # 2030-01-30 is a Wednesday
+    today = date(2030, 1, 30)
+
+    assert resolve_day("Wed 30", today, 0) == date(2030, 1, 30)
+    assert resolve_day("Fri\n1", today, 2) == date(2030, 2, 1)
+    # a week ahead on the next page of the calendar
+    assert resolve_day("Mon 4", today, 12) == date(2030, 2, 4)
+
+
+def test_labels_without_a_day_fall_back_to_the_offset():
+    today = date(2030, 1, 30)
+
+    assert resolve_day("Today", today, 0) == today
+    assert resolve_day("", today, 3) == date(2030, 2, 2)
+    assert resolve_day(None, today, 1) == date(2030, 1, 31)
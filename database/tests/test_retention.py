@@ -0,0 +1,138 @@
+from datetime import date
+
+from conftest import NEW_YORK, make_session
+from firestore.batch_writer import BatchWriter
+from firestore.retention import (
+    ARCHIVE_COLLECTION,
+    RetentionJob,
+    archive_id,
+    decode_archive,
+)
+from firestore.sessions import SESSIONS_COLLECTION, flat_id
+from firestore.snapshot import SNAPSHOT_COLLECTION, snapshot_id
+
+CUTOFF = date(2030, 2, 1)
+
+
+def store_sessions(db, studio, *sessions):
+    for session in sessions:
+        day = f"{session.start_time:%Y-%m-%d}"
+        id = f"{day}{session.session_name}"
+        db.collection("classes").document(studio).collection(day).document(id).set(
+            session.to_dict()
+        )
+        db.collection(SESSIONS_COLLECTION).document(flat_id(studio, id)).set(
+            {"studio": studio, **session.to_dict()}
+        )
+
+
+def retention(db, **options):
+    return RetentionJob(db, CUTOFF, writer=BatchWriter(db, backoff=0), **options)
+
+
+def archive(db, studio, month):
+    document = db.store[(ARCHIVE_COLLECTION, archive_id(studio, month))]
+    return decode_archive(document["sessions"])
+
+
+def test_dry_run_leaves_the_store_unchanged(db):
+    store_sessions(db, "BDC", make_session("2030-01-15"), make_session("2030-02-03"))
+    db.collection(SNAPSHOT_COLLECTION).document(snapshot_id("2030-W02", "BDC")).set(
+        {"week": "2030-W02"}
+    )
+    before = dict(db.store)
+
+    reports = retention(db, dry_run=True).run(["BDC"])
+
+    assert db.store == before
+    assert db.commits == []
+    assert (reports[0].months, reports[0].dates, reports[0].documents) == (1, 1, 1)
+    assert reports[0].archived_bytes > 0
+    assert reports[-1].documents == 1
+
+
+def test_past_sessions_are_archived_and_deleted(db):
+    store_sessions(
+        db,
+        "BDC",
+        make_session("2029-12-31", name="Ballet"),
+        make_session("2030-01-15", name="Jazz", instructor="Ana"),
+        make_session("2030-01-15", hour=12, name="Tap"),
+        make_session("2030-02-01", name="Jazz"),
+    )
+
+    report = retention(db).run(["BDC"])[0]
+
+    assert (report.months, report.dates, report.documents) == (2, 2, 3)
+    assert (report.deleted, report.failed) == (6, 0)
+    # only the cutoff date and later are left, in both collections
+    assert sorted(db.documents("classes")) == [
+        ("classes", "BDC", "2030-02-01", "2030-02-01Jazz")
+    ]
+    assert sorted(db.documents(SESSIONS_COLLECTION)) == [
+        (SESSIONS_COLLECTION, flat_id("BDC", "2030-02-01Jazz"))
+    ]
+    january = archive(db, "BDC", "2030-01")
+    assert sorted(january["2030-01-15"]) == ["2030-01-15Jazz", "2030-01-15Tap"]
+    jazz = january["2030-01-15"]["2030-01-15Jazz"]
+    assert jazz["instructor"] == "Ana"
+    assert jazz["start_time"] == make_session("2030-01-15").start_time
+    assert db.store[(ARCHIVE_COLLECTION, archive_id("BDC", "2030-01"))]["count"] == 2
+    assert list(archive(db, "BDC", "2029-12")) == ["2029-12-31"]
+
+
+def test_reruns_merge_into_the_month_archive(db):
+    store_sessions(db, "BDC", make_session("2030-01-10", name="Jazz"))
+    retention(db).run(["BDC"])
+    # a session of an archived date crawled late, and a new date of the month
+    store_sessions(
+        db,
+        "BDC",
+        make_session("2030-01-10", hour=18, name="Tap"),
+        make_session("2030-01-20", name="Ballet"),
+    )
+
+    report = retention(db).run(["BDC"])[0]
+
+    assert report.documents == 2
+    january = archive(db, "BDC", "2030-01")
+    assert {day: sorted(sessions) for day, sessions in january.items()} == {
+        "2030-01-10": ["2030-01-10Jazz", "2030-01-10Tap"],
+        "2030-01-20": ["2030-01-20Ballet"],
+    }
+    assert db.store[(ARCHIVE_COLLECTION, archive_id("BDC", "2030-01"))]["count"] == 3
+    assert db.documents("classes") == {}
+
+
+def test_snapshots_of_past_weeks_are_deleted(db):
+    # the cutoff 2030-02-01 falls in 2030-W05
+    for week in ("2030-W03", "2030-W04", "2030-W05", "2030-W06"):
+        db.collection(SNAPSHOT_COLLECTION).document(snapshot_id(week, "BDC")).set(
+            {"week": week}
+        )
+
+    report = retention(db).run([])[-1]
+
+    assert (report.documents, report.deleted) == (2, 2)
+    assert sorted(path[-1] for path in db.documents(SNAPSHOT_COLLECTION)) == [
+        snapshot_id("2030-W05", "BDC"),
+        snapshot_id("2030-W06", "BDC"),
+    ]
+
+
+def test_exports_of_later_runs_keep_earlier_files(db, tmp_path):
+    import pyarrow.dataset as ds
+
+    # 2030-01-20 and 2030-01-21 are in different ISO weeks, 01-21 and 01-22 are not
+    store_sessions(db, "BDC", make_session("2030-01-20"), make_session("2030-01-21"))
+    retention(db, archive_dir=str(tmp_path)).run(["BDC"])
+    store_sessions(db, "BDC", make_session("2030-01-22"))
+    retention(db, archive_dir=str(tmp_path)).run(["BDC"])
+
+    table = ds.dataset(str(tmp_path), format="parquet", partitioning="hive").to_table()
+
+    starts = sorted(
+        start.astimezone(NEW_YORK).date()
+        for start in table.column("start_time").to_pylist()
+    )
+    assert starts == [date(2030, 1, 20), date(2030, 1, 21), date(2030, 1, 22)]
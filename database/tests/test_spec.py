@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+
+from conftest import NEW_YORK, make_session
+from studios.healcode import HealcodeStudioHandler
+from studios.modega import ModegaCrawler
+from studios.session import Session
+from studios.spec import PopupSpec, StudioSpec, crawler_class, load_studio_specs
+
+SINGLE_PAGE = {
+    "url": "https://studio.example",
+    "widget": "healcode",
+    "ready_xpath": "//div[contains(@class, 'bw-widget__day')]",
+    "container_xpath": "//div[@class='bw-session']",
+    "next_xpath": "//button[contains(@class, 'next')]",
+}
+
+
+def paged_crawler(pages: List[List[str]], moves: bool = True, horizon_days=21):
+    """
+    a single page crawler showing sessions on the dates of `pages`, one page at a
+    time; the next page control only moves the schedule when `moves` is set
+    """
+
+    class PagedCrawler(crawler_class(StudioSpec.from_dict("Paged", SINGLE_PAGE))):
+        page = 0
+        clicks = 0
+
+        def read_sessions(self, plan) -> List[Session]:
+            return [make_session(day) for day in pages[self.page]]
+
+        def next_page(self) -> None:
+            self.clicks += 1
+            if moves:
+                self.page += 1
+
+    crawler = PagedCrawler(None, "u")
+    crawler.horizon_days = horizon_days
+    return crawler
+
+
+def weeks(count: int) -> List[List[str]]:
+    today = datetime.now(NEW_YORK).date()
+    return [
+        [(today + timedelta(days=7 * week + d)).isoformat() for d in range(7)]
+        for week in range(count)
+    ]
+
+
+def test_pages_are_read_until_the_horizon():
+    crawler = paged_crawler(weeks(5), horizon_days=14)
+
+    sessions = list(crawler.read_pages())
+
+    assert len(sessions) == 14
+    assert crawler.clicks == 1
+
+
+def test_paging_stops_when_the_schedule_does_not_move():
+    crawler = paged_crawler(weeks(5), moves=False)
+
+    sessions = list(crawler.read_pages())
+
+    # the first page is read again once, then paging gives up
+    assert crawler.clicks == 1
+    assert len(sessions) == 14
+
+
+def test_the_shipped_site_data_compiles():
+    specs = load_studio_specs()
+
+    assert {"Peri", "Modega", "BDC"} <= set(specs)
+    for spec in specs.values():
+        cls = crawler_class(spec)
+        assert cls.spec is spec
+        assert cls.day_tabs == spec.tabs
+
+
+def test_specs_are_compiled_into_crawlers():
+    spec = StudioSpec.from_dict(
+        "Studio",
+        {
+            **SINGLE_PAGE,
+            "popup": {"close_xpath": "//a[@class='close']"},
+            "fields": {"session_name": ".//h3", "url": [".//a", "href"]},
+            "static_weeks": 3,
+            "tabs": 2,
+        },
+    )
+
+    cls = crawler_class(spec)
+
+    assert issubclass(cls, HealcodeStudioHandler)
+    assert spec.popup == PopupSpec(close_xpath="//a[@class='close']")
+    assert cls.plan.field_specs == (
+        ("session_name", ".//h3", None),
+        ("url", ".//a", "href"),
+    )
+    assert (cls.static_weeks, cls.day_tabs) == (3, 2)
+
+
+@pytest.mark.parametrize(
+    "changes, error",
+    [
+        ({"next_button": "//a"}, "unknown keys"),
+        ({"widget": "mindbody"}, "unsupported widget"),
+        ({"navigation": "infinite_scroll"}, "unknown navigation"),
+        ({"container_xpath": None}, "container_xpath are required"),
+        ({"tabs": 0}, "tabs must be at least 1"),
+    ],
+)
+def test_invalid_specs_are_rejected(changes, error):
+    with pytest.raises(ValueError, match=error):
+        StudioSpec.from_dict("Broken", {**SINGLE_PAGE, **changes})
+
+
+def test_other_widgets_need_no_healcode_selectors():
+    spec = StudioSpec.from_dict("Modega", {"url": "u", "widget": "sutrapro"})
+
+    assert issubclass(crawler_class(spec), ModegaCrawler)
+    assert spec.clicks_days
+    assert not StudioSpec.from_dict("BDC", SINGLE_PAGE).clicks_days
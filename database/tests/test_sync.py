@@ -0,0 +1,156 @@
+from conftest import make_session
+from firestore.batch_writer import BatchWriter
+from firestore.sessions import flat_id
+from firestore.sync import SessionSync
+
+
+def keyed(*sessions):
+    return {
+        (
+            s.start_time.strftime("%Y-%m-%d"),
+            f"{s.start_time:%Y-%m-%d}{s.session_name}",
+        ): s
+        for s in sessions
+    }
+
+
+def sync_once(db, sessions, **options):
+    sync = SessionSync(db, BatchWriter(db, backoff=0))
+    plan = sync.plan("BDC", sessions, **options)
+    sync.commit("BDC", plan)
+    sync.save_manifest("BDC", plan.manifest)
+    return plan
+
+
+def stored_ids(db, collection="classes"):
+    return sorted(path[-1] for path in db.documents(collection))
+
+
+def test_first_sync_inserts_and_mirrors_every_session(db):
+    sessions = keyed(
+        make_session("2030-01-01", name="Jazz"),
+        make_session("2030-01-02", name="Ballet"),
+    )
+
+    plan = sync_once(db, sessions)
+
+    assert (plan.inserted, plan.updated, plan.deleted, plan.unchanged) == (2, 0, 0, 0)
+    assert stored_ids(db) == ["2030-01-01Jazz", "2030-01-02Ballet"]
+    assert stored_ids(db, "sessions") == [
+        flat_id("BDC", "2030-01-01Jazz"),
+        flat_id("BDC", "2030-01-02Ballet"),
+    ]
+    assert plan.written == 4
+
+
+def test_only_changed_sessions_are_written(db):
+    sync_once(db, keyed(make_session("2030-01-01"), make_session("2030-01-02")))
+    db.commits.clear()
+
+    plan = sync_once(
+        db,
+        keyed(
+            make_session("2030-01-01"),
+            make_session("2030-01-02", instructor="Ana"),
+        ),
+    )
+
+    assert (plan.inserted, plan.updated, plan.unchanged) == (0, 1, 1)
+    # the class document and its flat copy
+    assert db.commits == [2]
+    document = db.store[("classes", "BDC", "2030-01-02", "2030-01-02Jazz")]
+    assert document["instructor"] == "Ana"
+
+
+def test_rewrite_writes_unchanged_sessions(db):
+    sessions = keyed(make_session("2030-01-01"))
+    sync_once(db, sessions)
+
+    plan = sync_once(db, sessions, rewrite=True)
+
+    assert (plan.updated, plan.unchanged) == (1, 0)
+
+
+def test_vanished_sessions_within_the_crawled_window_are_deleted(db):
+    sync_once(
+        db,
+        keyed(
+            make_session("2030-01-01", name="Jazz"),
+            make_session("2030-01-01", hour=12, name="Tap"),
+            make_session("2030-01-02", name="Ballet"),
+            make_session("2030-02-01", name="Later"),
+        ),
+    )
+
+    plan = sync_once(
+        db,
+        keyed(
+            make_session("2030-01-01", name="Jazz"),
+            make_session("2030-01-02", name="Ballet"),
+        ),
+    )
+
+    assert plan.deleted == 1
+    # dates after the crawled window are left alone
+    assert stored_ids(db) == ["2030-01-01Jazz", "2030-01-02Ballet", "2030-02-01Later"]
+    assert flat_id("BDC", "2030-01-01Tap") not in stored_ids(db, "sessions")
+    assert "2030-02-01" in plan.manifest
+
+
+def test_deletes_are_skipped_when_not_allowed(db):
+    sync_once(
+        db,
+        keyed(make_session("2030-01-01", name="Jazz"), make_session("2030-01-02")),
+    )
+
+    plan = sync_once(db, keyed(make_session("2030-01-02")), allow_deletes=False)
+
+    assert plan.deleted == 0
+    assert stored_ids(db) == ["2030-01-01Jazz", "2030-01-02Jazz"]
+    # the kept session stays in the manifest so a later sync can still delete it
+    assert plan.manifest["2030-01-01"] == {
+        "2030-01-01Jazz": plan.previous["2030-01-01"]["2030-01-01Jazz"]
+    }
+
+
+def test_dates_that_failed_to_crawl_keep_their_sessions(db):
+    days = ["2030-01-01", "2030-01-02", "2030-01-03"]
+    sync_once(db, keyed(*(make_session(day) for day in days)))
+
+    plan = sync_once(
+        db,
+        keyed(make_session("2030-01-01"), make_session("2030-01-03")),
+        keep_dates=["2030-01-02"],
+    )
+
+    assert plan.deleted == 0
+    assert stored_ids(db) == ["2030-01-01Jazz", "2030-01-02Jazz", "2030-01-03Jazz"]
+
+
+def test_syncing_in_parts_matches_a_single_plan(db):
+    sync_once(
+        db,
+        keyed(
+            make_session("2030-01-01", name="Jazz"),
+            make_session("2030-01-02", name="Tap"),
+        ),
+    )
+    sync = SessionSync(db, BatchWriter(db, backoff=0))
+
+    plan = sync.begin("BDC")
+    sync.add("BDC", plan, keyed(make_session("2030-01-01", name="Jazz")))
+    sync.add("BDC", plan, keyed(make_session("2030-01-02", name="Ballet")))
+    sync.finish("BDC", plan)
+    sync.commit("BDC", plan)
+
+    assert (plan.inserted, plan.unchanged, plan.deleted) == (1, 1, 1)
+    assert stored_ids(db) == ["2030-01-01Jazz", "2030-01-02Ballet"]
+
+
+def test_nothing_is_deleted_without_sessions(db):
+    sync_once(db, keyed(make_session("2030-01-01")))
+
+    plan = sync_once(db, {})
+
+    assert plan.deleted == 0
+    assert stored_ids(db) == ["2030-01-01Jazz"]
@@ -0,0 +1,15 @@
+from datetime import timezone
+
+from conftest import make_session
+from weekly_email import ClassDatabase
+
+
+def test_classes_are_listed_in_new_york_time():
+    late = make_session("2030-01-07", 21, "Late Jazz", minutes=90)
+    # as read back from Firestore: Tuesday 02:00 UTC
+    late.start_time = late.start_time.astimezone(timezone.utc)
+    late.end_time = late.end_time.astimezone(timezone.utc)
+
+    content = ClassDatabase.__new__(ClassDatabase).constructEmail([late])
+
+    assert "Monday, January 07, 2030 at 09:00 PM to 10:30 PM" in content
@@ -2,133 +2,102 @@ from dotenv import load_dotenv
 
 load_dotenv()
 import os
-from firestore_util import Firebase
+from firestore.firestore_util import Firebase
+from studios.spec import load_studio_specs
+from firestore.snapshot import read_upcoming_classes
+from firestore.pagination import iter_pages
+from emails.matching import SessionIndex
+from studios.session import Session, edt_timezone, local_time
+from emails.delivery import SmtpDelivery
 from datetime import datetime
-import json
+from typing import Iterator, List, Tuple
 from email.message import EmailMessage
-import ssl
-import os
-import smtplib
 
 # gmail SMTP setup
 email_password = os.environ.get("app-password")
 email_sender = os.environ.get("app-email")
+smtp_host = os.environ.get("smtp-host", "smtp.gmail.com")
+smtp_port = int(os.environ.get("smtp-port", "465"))
+smtp_ssl = os.environ.get("smtp-ssl", "true").lower() != "false"
+# gmail allows a limited number of messages per second and per day
+smtp_rate = float(os.environ.get("smtp-rate", "1"))
+
+USER_PAGE_SIZE = 500
 
 
 # helper functions
 def hasPreferences(obj) -> bool:
     if len(obj.items()) == 0:
         return False
-    for _, val in obj.items:
-        if len(val) > 0:
+    for _, val in obj.items():
+        if val is not None and len(val) > 0:
             return True
     return False
 
 
-def get_day_of_week(date_str):
-    date_obj = datetime.datetime.strptime(date_str, "%Y-%m-%d")
-
-    day_of_week = date_obj.strftime("%A")
-
-    return day_of_week
-
-
-def filter_classes(classes, preferences):
-    filtered_classes = []
-
-    level = preferences.get("level", "").lower()
-    style = preferences.get("style", "").lower()
-    instructor = preferences.get("instructor", "").lower()
-
-    for class_obj in classes:
-        class_description = class_obj.get("id").lower()
-        if class_obj.get("instructor", "").lower() == instructor:
-            if level in class_description and style in class_description:
-                filtered_classes.append(class_obj)
-
-    return filtered_classes
-
-
 # class_db Class
 # should contain all data
 # should include method for matching classes
 class ClassDatabase:
     def __init__(self) -> None:
-        f = open("site_data.json")
-        config = json.load(f)
-        studios = config["urls"]
+        studios = load_studio_specs()
         db = Firebase().create_firebase_admin()
-        today = datetime.today()
+        today = datetime.now(edt_timezone)
         self.today = today.strftime("%Y %m %d").replace(" ", "-")
         # filter for only relevant classes that are in the future
         # store date in the format of:
         # {
-        #   studio: {
-        #     date: [classes]}
+        #   studio: SessionBatch of upcoming classes
         # }
-        results = {studio: {} for studio, _ in studios.items()}
         try:
-            for studio_name, _ in studios.items():
-                studio_ref = db.collection("classes").document(studio_name)
-                for coll in studio_ref.collections():
-                    if coll.id >= self.today:
-                        results[studio_name][coll.id] = []
-                        for doc in coll.stream():
-                            results[studio_name][coll.id].append(doc.to_dict())
+            results = read_upcoming_classes(db, studios.keys(), self.today)
         except Exception as e:
             # TODO: add better custom error message for class data receival
             raise e
 
-        # get a list of all users
-        users = []
-        try:
-            for user_ref in db.collection("users").stream():
-                users.append(user_ref.to_dict())
-        except Exception as e:
-            raise e
-
+        # users are streamed page by page when matching, see iterUsers
         self.data = results
-        self.users = users
         self.db = db
-
-    # TODO: first handle parsing preferences
-    def getCustomizedNews(self):
+        # index the week's classes once, each user is then a few set intersections
+        self.index = SessionIndex(results)
+
+    def iterUsers(self, page_size: int = USER_PAGE_SIZE) -> Iterator[dict]:
+        for page in iter_pages(self.db.collection("users"), page_size):
+            for user_ref in page:
+                yield user_ref.to_dict()
+
+    def iterCustomizedNews(self) -> Iterator[Tuple[str, List[Session]]]:
+        """
+        yield (email, matching classes) for each user with preferences, reading users
+        one page at a time so memory stays flat regardless of user count
+        """
         # TODO: generate a default list of classes
-        user_emails = {}
-        for user in self.users:
-            preferences = user["preferences"] if hasattr(user, "preferences") else None
-            matching_classes = []
-            if preferences != None and hasPreferences(preferences):
-                user_emails[user.email] = []
-                # TODO: improve filtering behavior
-                for studio, dates in self.data.items():
-                    if preferences.studio and studio not in preferences.studio:
-                        continue
-                    else:
-                        for date, classes in dates.items():
-                            day = get_day_of_week(date)
-                            if (
-                                preferences.dayOfWeek
-                                and day not in preferences.dayOfWeek
-                            ):
-                                continue
-                            else:
-                                matching_classes = filter_classes(preferences, classes)
-                                user_emails[user.emmail].append(matching_classes)
+        matched = total = 0
+        for user in self.iterUsers():
+            total += 1
+            preferences = user.get("preferences")
+            email = user.get("email")
+            if email and preferences and hasPreferences(preferences):
+                matching_classes = self.index.match(preferences)
+                if matching_classes:
+                    matched += 1
+                    yield email, matching_classes
             # TODO: we should draft "default" emails for users with no preferences (and also use it if user had no matches)
-        print(user_emails)
-        self.user_email_classes = user_emails
+        print(f"matched classes for {matched} of {total} users")
+
+    def getCustomizedNews(self):
+        self.user_email_classes = dict(self.iterCustomizedNews())
 
     # TODO: create a template for generating news emails given news
     def constructEmail(self, data):
         content = "Hello from Dance Atlas NYC! \n Here are upcoming class offerings in NYC studios that match your preferences: \n"
         for details in data:
-            start_time = details["start_time"]
-            end_time = details["end_time"]
-            instructor = details.get("instructor", "unknown instructor")
-            session_name = details.get("session_name", "unknow dance class")
-            url = details.get("url", "")
-            location = details.get("location", "unknown location")
+            start_time = local_time(details.start_time)
+            end_time = local_time(details.end_time)
+            instructor = details.instructor or "unknown instructor"
+            session_name = details.session_name or "unknow dance class"
+            url = details.url or ""
+            location = details.location or "unknown location"
 
             # Formatting the start and end times to a more readable format
             start_time_str = start_time.strftime("%A, %B %d, %Y at %I:%M %p")
@@ -148,29 +117,36 @@ class ClassDatabase:
         print(f"content is: {content}")
         return content
 
-    # TODO: send emails to active users
     def sendEmails(self):
-        # getCustomizedNews will create personalized content
+        # iterCustomizedNews will create personalized content
         # constructEmail will generate the raw content
-        # finally send the emails
-        context = ssl.create_default_context()
-        try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as smtp:
-                smtp.login(email_sender, email_password)
-                for user_email, user_classes in self.user_email_classes.items():
-                    content = self.constructEmail(user_classes)
-                    em = EmailMessage()
-                    em["From"] = email_sender
-                    em["To"] = user_email
-                    em["Subject"] = "[Dance Atlas NYC] Your Weekly Class Update"
-                    em.set_content(content)
-                    smtp.sendmail(email_sender, user_email, em.as_string())
-        except Exception:
-            print("Error encountered while sending emails")
-        return
+        # finally send the emails over a small pool of rate limited connections,
+        # recording progress so a rerun this week resumes where it stopped
+        year, week, _ = datetime.today().isocalendar()
+        delivery = SmtpDelivery(
+            smtp_host,
+            smtp_port,
+            email_sender,
+            email_password,
+            use_ssl=smtp_ssl,
+            per_second=smtp_rate,
+            log_path=f"email_progress_{year}-W{week:02d}.jsonl",
+        )
+
+        def messages():
+            # matching and email construction happen as users stream in
+            for user_email, user_classes in self.iterCustomizedNews():
+                content = self.constructEmail(user_classes)
+                em = EmailMessage()
+                em["From"] = email_sender
+                em["To"] = user_email
+                em["Subject"] = "[Dance Atlas NYC] Your Weekly Class Update"
+                em.set_content(content)
+                yield user_email, em
+
+        return delivery.send_all(messages())
 
 
 if __name__ == "__main__":
     classData = ClassDatabase()
-    classData.getCustomizedNews()
     classData.sendEmails()